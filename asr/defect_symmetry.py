@@ -2,9 +2,12 @@ from asr.core import command, option, ASRResult, prepare_result, read_json
 from ase.geometry import wrap_positions
 from asr.database.browser import make_panel_description, href, describe_entry
 import spglib as spg
+import re
 import typing
 import numpy as np
 import warnings
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 from pathlib import Path
 from ase.io import read
 
@@ -28,53 +31,24 @@ Analysis of defect states localized inside the pristine bandgap (energetics and
 )
 
 
-def get_number_of_rows(res, spin, vbm, cbm):
-    counter = 0
-    for i in range(len(res)):
-        if (int(res[i]['spin']) == spin
-           and res[i]['energy'] < cbm
-           and res[i]['energy'] > vbm):
-            counter += 1
-
-    return counter
-
-
 def get_matrixtable_array(state_results, vbm, cbm, ef,
                           spin, style):
-    Nrows = get_number_of_rows(state_results, spin, vbm, cbm)
-    state_array = np.empty((Nrows, 5), dtype='object')
-    rowlabels = []
-    spins = []
-    energies = []
-    symlabels = []
-    accuracies = []
-    loc_ratios = []
-    for i, row in enumerate(state_results):
-        rowname = f"{int(state_results[i]['state']):.0f}"
-        label = str(state_results[i]['best'])
-        labelstr = label.lower()
-        splitstr = list(labelstr)
-        if len(splitstr) == 2:
-            labelstr = f'{splitstr[0]}<sub>{splitstr[1]}</sub>'
-        if state_results[i]['energy'] < cbm and state_results[i]['energy'] > vbm:
-            if int(state_results[i]['spin']) == spin:
-                rowlabels.append(rowname)
-                spins.append(f"{int(state_results[i]['spin']):.0f}")
-                energies.append(f"{state_results[i]['energy']:.2f}")
-                if style == 'symmetry':
-                    symlabels.append(labelstr)
-                    accuracies.append(f"{state_results[i]['error']:.2f}")
-                    loc_ratios.append(f"{state_results[i]['loc_ratio']:.2f}")
-    state_array = np.empty((Nrows, 5), dtype='object')
-    rowlabels.sort(reverse=True)
-
-    for i in range(Nrows):
-        state_array[i, 1] = spins[i]
+    gapstates = [res for res in state_results
+                 if int(res['spin']) == spin and vbm < res['energy'] < cbm]
+    state_array = np.empty((len(gapstates), 5), dtype='object')
+    rowlabels = sorted([f"{int(res['state']):.0f}" for res in gapstates],
+                       reverse=True)
+
+    for i, res in enumerate(gapstates):
+        state_array[i, 1] = f"{int(res['spin']):.0f}"
         if style == 'symmetry':
-            state_array[i, 0] = symlabels[i]
-            state_array[i, 2] = accuracies[i]
-            state_array[i, 3] = loc_ratios[i]
-        state_array[i, 4] = energies[i]
+            labelstr = str(res['best']).lower()
+            if len(labelstr) == 2:
+                labelstr = f'{labelstr[0]}<sub>{labelstr[1]}</sub>'
+            state_array[i, 0] = labelstr
+            state_array[i, 2] = f"{res['error']:.2f}"
+            state_array[i, 3] = f"{res['loc_ratio']:.2f}"
+        state_array[i, 4] = f"{res['energy']:.2f}"
     state_array = state_array[state_array[:, -1].argsort()]
 
     return state_array, rowlabels
@@ -177,9 +151,7 @@ def get_summary_table(result, row):
     spglib = get_spg_href('https://spglib.github.io/spglib/')
     basictable = table(row, 'Defect properties', [])
     pg_string = result.defect_pointgroup
-    pg_strlist = list(pg_string)
-    sub = ''.join(pg_strlist[1:])
-    pg_string = f'{pg_strlist[0]}<sub>{sub}</sub>'
+    pg_string = f'{pg_string[0]}<sub>{pg_string[1:]}</sub>'
     pointgroup = describe_pointgroup_entry(spglib)
     basictable['rows'].extend(
         [[pointgroup, pg_string]])
@@ -320,22 +292,19 @@ def main(primitivefile: str = 'primitive.json',
     asr.setup.defects in order to correctly run this recipe. Furthermore,
     run asr.get_wfs beforehand to write out the needed wavefunctions.
     """
-    from ase.io.cube import read_cube_data
-    from gpaw import restart
     from gpaw.point_groups import SymmetryChecker, point_group_names
 
     # define path of the current directory, and initialize DefectInfo class
     defectdir = Path('.')
     defectinfo = DefectInfo(defectpath=defectdir)
 
-    # everything where files are handled: input structures, wf_results,
-    # calculator and cubefilepaths
+    # everything where files are handled: input structures, wf_results
+    # and cubefilepaths
     structurefile = 'structure.json'
     structure, unrelaxed, primitive, pristine = check_and_return_input(
         structurefile, unrelaxedfile, primitivefile, pristinefile)
-    wf_result = read_json('results-asr.get_wfs.json')
+    wf_results = get_wf_results_by_state(read_json('results-asr.get_wfs.json'))
     pris_result = get_pristine_result()
-    atoms, calc = restart('gs.gpw', txt=None)
     cubefilepaths = list(defectdir.glob('*.cube'))
     if len(cubefilepaths) == 0:
         raise FileNotFoundError('WARNING: no cube files available in this '
@@ -356,38 +325,50 @@ def main(primitivefile: str = 'primitive.json',
     point_group = get_spg_symmetry(mapped_structure)
     print(f'INFO: point group of the defect: {point_group}')
 
-    # loop over cubefiles to save symmetry results
+    # loop over cubefiles to save symmetry results. All cubefiles share the
+    # cell and grid of the calculation, so the grid quantities are only
+    # evaluated again if the shape of the wavefunction grid changes
     symmetry_results = []
     centers = []
-    for cubefilepath in cubefilepaths:
-        cubefilename = str(cubefilepath)
-        wfcubefile = WFCubeFile.fromfilename(cubefilename)
-        # read cubefile and atoms
-        wf, atoms = read_cube_data(wfcubefile.filename)
+    shift = [0.5, 0.5, 0]
+    Ngrid = None
+    wfcubefiles = [WFCubeFile.fromfilename(str(cubefilepath))
+                   for cubefilepath in cubefilepaths]
+    # read cubefiles and atoms, the next file is read during the analysis
+    cubedata = read_cube_files([wfcubefile.filename
+                                for wfcubefile in wfcubefiles])
+    for wfcubefile, (wf, atoms) in zip(wfcubefiles, cubedata):
+        if wf.shape != Ngrid:
+            Ngrid = wf.shape
+            gridvec = (atoms.cell.T / wf.shape).T
+            dv = abs(np.linalg.det(gridvec))
+            zrange = get_zrange(Ngrid, dim=sum(atoms.pbc))
+            gridpoints = get_gridpoints(cell=atoms.cell, Ngrid=Ngrid,
+                                        shift=shift, zrange=zrange)
         # calculate localization ratio
-        localization = get_localization_ratio(atoms, wf, calc)
+        localization = get_localization_ratio(atoms, wf, dv=dv)
         # evaluate defect center
-        Ngrid = calc.get_number_of_grid_points()
-        shift = [0.5, 0.5, 0]
-        dim = sum(atoms.pbc)
-        center = get_defect_center_from_wf(wf=wf, cell=atoms.cell, Ngrid=Ngrid,
-                                           shift=shift, dim=dim)
+        center = get_defect_center_from_wf(wf=wf, cell=atoms.cell,
+                                           gridpoints=gridpoints,
+                                           shift=shift, zrange=zrange)
         centers.append(center)
         # extract WF results and energies
-        res_wf = find_wf_result(wf_result, wfcubefile.band, wfcubefile.spin)
+        res_wf = _lookup_wf_result(wf_results, wfcubefile.band,
+                                   wfcubefile.spin)
         energy = res_wf['energy']
         # only evaluate 'best' and 'error' for knows point groups
         if point_group in point_group_names:
             # symmetry analysis only for point groups implemented in GPAW
             checker = SymmetryChecker(point_group, center, radius=radius)
-            dct = checker.check_function(wf, (atoms.cell.T / wf.shape).T)
+            dct = checker.check_function(wf, gridvec)
             best = dct['symmetry']
-            error = (np.array(list(dct['characters'].values()))**2).sum()
-            irrep_results = []
-            for element in dct['characters']:
-                irrep_result = IrrepResult.fromdata(
-                    sym_name=element, sym_score=dct['characters'][element])
-                irrep_results.append(irrep_result)
+            characters = dct['characters']
+            chars = np.fromiter(characters.values(), dtype=float,
+                                count=len(characters))
+            error = float(chars @ chars)
+            irrep_results = [IrrepResult.fromdata(sym_name=element,
+                                                  sym_score=score)
+                             for element, score in characters.items()]
         # otherwise, set irrep results and 'best', 'error' to None
         else:
             irrep_results = [IrrepResult.fromdata(
@@ -415,12 +396,31 @@ def main(primitivefile: str = 'primitive.json',
         pristine=pris_result)
 
 
+def read_cube_files(filenames):
+    """Yield wavefunction and atoms of the cubefiles in the given order.
+
+    The next cubefile is read in a background thread while the data of the
+    current one is processed.
+    """
+    from ase.io.cube import read_cube_data
+
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        future = None
+        for filename in filenames:
+            nextfuture = pool.submit(read_cube_data, filename)
+            if future is not None:
+                yield future.result()
+            future = nextfuture
+        if future is not None:
+            yield future.result()
+
+
 def average_centers(centers):
     return np.average(centers, axis=0)
 
 
-def get_defect_center_from_wf(wf, cell, Ngrid, shift, dim):
-    """Extract defect center from individual wavefunction cubefile."""
+def get_zrange(Ngrid, dim):
+    """Return the z-indices of the grid used to evaluate the defect center."""
     if dim == 2:
         midpoint = Ngrid[2] // 2
         zrange = range(midpoint - 5, midpoint + 5)
@@ -429,9 +429,14 @@ def get_defect_center_from_wf(wf, cell, Ngrid, shift, dim):
               'is centered along the z-direction of the cell.')
     else:
         zrange = range(Ngrid[2])
-    wf_array = get_gridpoints(cell=cell, Ngrid=Ngrid, shift=shift, zrange=zrange)
+
+    return zrange
+
+
+def get_defect_center_from_wf(wf, cell, gridpoints, shift, zrange):
+    """Extract defect center from individual wavefunction cubefile."""
     density = np.square(wf)
-    center = get_center_of_mass(wf_array, density, zrange)
+    center = get_center_of_mass(gridpoints, density, zrange)
     center -= shift * cell.sum(axis=0)
     # center = shift_positions(center_shifted, shift, cell, invert=True)
 
@@ -447,16 +452,10 @@ def get_total_mass(m, zrange):
 def get_center_of_mass(r, m, zrange):
     """Calculate the center of set of positions r, and weights m."""
     M = get_total_mass(m, zrange)
-    coords = [0, 0, 0]
-    for i in range(3):
-        rflat = r[:, :, zrange, i].flatten()
-        mflat = m[:, :, zrange].flatten()
-        smd = 0
-        for j in range(len(mflat)):
-            smd += mflat[j] * rflat[j]
-        coords[i] = smd
+    mflat = m[:, :, zrange].ravel()
+    rflat = r[:, :, zrange].reshape(-1, 3)
 
-    return coords / M
+    return mflat @ rflat / M
 
 
 def grid_generator(Ngrid, zrange):
@@ -501,10 +500,9 @@ def get_gridpoints(cell, Ngrid, shift, zrange):
 
 def get_spin_and_band(wf_file):
     """Extract spin and band index from cube file name."""
-    spin = str(wf_file)[str(wf_file).find('_') + 1]
-    band = str(wf_file)[str(wf_file).find('.') + 1: str(wf_file).find('_')]
+    wfcubefile = WFCubeFile.fromfilename(str(wf_file))
 
-    return int(spin), int(band)
+    return wfcubefile.spin, wfcubefile.band
 
 
 def get_pristine_result():
@@ -535,35 +533,44 @@ def get_pristine_result():
         gap=res_pris['gap'])
 
 
-def get_localization_ratio(atoms, wf, calc):
+def get_localization_ratio(atoms, wf, dv=None):
     """
     Return the localization ratio of the wavefunction.
 
     It is defined as the volume of the cell divided the
-    integral of the fourth power of the wavefunction.
+    integral of the fourth power of the wavefunction. The volume
+    element dv of the grid can be passed if it is already known.
     """
-    assert wf.size == np.prod(calc.wfs.gd.N_c), (
-        'grid points in wf cube file and calculator '
-        'are not the same!')
-
-    dv = atoms.cell.volume / wf.size
-    V = atoms.get_volume()
-
-    IPR = 1 / ((wf**4).sum() * dv)
+    V = atoms.cell.volume
+    if dv is None:
+        dv = V / wf.size
+
+    # sum of wf**4 as a dot product of wf**2 with itself, which avoids
+    # the temporaries of the fourth power
+    wf2 = np.square(wf).ravel()
+    IPR = 1 / (np.dot(wf2, wf2) * dv)
     local_ratio = V / IPR
 
     return local_ratio
 
 
+def get_wf_results_by_state(wf_result):
+    """Return results of asr.get_wfs as a {(state, spin): wf} dictionary."""
+    return {(wf['state'], wf['spin']): wf for wf in wf_result['wfs']}
+
+
 def find_wf_result(wf_result, state, spin):
     """Read in results of asr.get_wfs and returns WaveFunctionResult."""
-    wfs = wf_result['wfs']
-    for wf in wfs:
-        if wf['state'] == state and wf['spin'] == spin:
-            return wf
+    return _lookup_wf_result(get_wf_results_by_state(wf_result), state, spin)
 
-    raise Exception('ERROR: can not find corresponging wavefunction result for '
-                    f'wavefunction no. {state}/{spin}!')
+
+def _lookup_wf_result(wf_results, state, spin):
+    """Return WaveFunctionResult from the output of get_wf_results_by_state."""
+    try:
+        return wf_results[(state, spin)]
+    except KeyError:
+        raise Exception('ERROR: can not find corresponging wavefunction result '
+                        f'for wavefunction no. {state}/{spin}!')
 
 
 def get_mapped_structure(structure, unrelaxed, primitive, pristine, defectinfo):
@@ -575,12 +582,10 @@ def get_mapped_structure(structure, unrelaxed, primitive, pristine, defectinfo):
     for delta in [0.1, 0.3]:
         # for cutoff in [0.01, 0.03, 0.1]:
         for cutoff in np.arange(0.1, 1.2, 0.5):
-            rel_tmp = rel_struc.copy()
-            ref_tmp = ref_struc.copy()
-            art_tmp = art_struc.copy()
-            rel_tmp = apply_shift(rel_tmp, delta)
-            ref_tmp = apply_shift(ref_tmp, delta)
-            art_tmp = apply_shift(art_tmp, delta)
+            # apply_shift returns shifted copies, the originals stay intact
+            rel_tmp = apply_shift(rel_struc, delta)
+            ref_tmp = apply_shift(ref_struc, delta)
+            art_tmp = apply_shift(art_struc, delta)
             indexlist = compare_structures(art_tmp, ref_tmp, cutoff)
             del ref_tmp[indexlist]
             del rel_tmp[indexlist]
@@ -598,9 +603,19 @@ def get_mapped_structure(structure, unrelaxed, primitive, pristine, defectinfo):
 
 def get_spg_symmetry(structure, symprec=0.1):
     """Return the symmetry of a given structure evaluated with spglib."""
-    spgcell = (structure.cell,
-               structure.get_scaled_positions(),
-               structure.numbers)
+    cell = np.ascontiguousarray(structure.cell, dtype=float)
+    spos = np.ascontiguousarray(structure.get_scaled_positions(), dtype=float)
+
+    return _get_spg_symmetry(cell.tobytes(), spos.tobytes(),
+                             tuple(structure.numbers.tolist()), symprec)
+
+
+@lru_cache(maxsize=32)
+def _get_spg_symmetry(cellbytes, sposbytes, numbers, symprec):
+    """Evaluate the spglib symmetry of a structure given as hashable data."""
+    spgcell = (np.frombuffer(cellbytes).reshape(3, 3),
+               np.frombuffer(sposbytes).reshape(-1, 3),
+               numbers)
     spg_sym = spg.get_spacegroup(spgcell, symprec=symprec, symbol_type=1)
 
     return spg_sym.split('^')[0]
@@ -616,14 +631,11 @@ def conserved_atoms(ref_struc, primitive, N, Nvac):
 
 
 def indexlist_cut_atoms(structure, threshold):
-    indexlist = []
     pos = structure.get_scaled_positions(wrap=False)
-    for i in range(len(structure)):
-        # save indices that are outside the new cell
-        if abs(max(pos[i]) > threshold) or min(pos[i]) < 1 - threshold:
-            indexlist.append(i)
+    # save indices that are outside the new cell
+    outside = (pos.max(axis=1) > threshold) | (pos.min(axis=1) < 1 - threshold)
 
-    return indexlist
+    return np.flatnonzero(outside).tolist()
 
 
 def compare_structures(ref_atoms, atoms, cutoff):
@@ -631,12 +643,12 @@ def compare_structures(ref_atoms, atoms, cutoff):
 
     tmp_atoms = atoms + ref_atoms
     nl = neighbor_list('i', tmp_atoms, cutoff=cutoff)
-    rmindexlist = []
-    for i in range(len(atoms)):
-        if i not in nl:
-            rmindexlist.append(i)
+    # flag every atom of 'atoms' that has at least one neighbour, instead
+    # of scanning the full neighbour list once per atom
+    matched = np.zeros(len(atoms), dtype=bool)
+    matched[nl[nl < len(atoms)]] = True
 
-    return rmindexlist
+    return np.flatnonzero(~matched).tolist()
 
 
 def recreate_symmetric_cell(structure, unrelaxed, primitive, pristine,
@@ -657,33 +669,62 @@ def recreate_symmetric_cell(structure, unrelaxed, primitive, pristine,
     cell = reference.get_cell()
     scell = structure.get_cell()
 
-    # create intermediate big structure for the relaxed structure
-    rel_struc = structure.repeat((5, 5, 1))
-    positions = rel_struc.get_positions()
-    positions += [-translation[0], -translation[1], 0]
-    positions += -2.0 * scell[0] - 1.0 * scell[1]
-    # positions += (0.5 + delta) * cell[0] + (0.5 + delta) * cell[1]
-    rel_struc.set_positions(positions)
+    # create intermediate big structures for the relaxed and unrelaxed
+    # structure, only keeping the atoms around the reference cell
+    shift = [-translation[0], -translation[1], 0]
+    images = get_mapping_images(unrelaxed, scell, cell, shift)
+    relpos = get_tiled_positions(structure, scell, images) + shift
+    refpos = get_tiled_positions(unrelaxed, scell, images) + shift
+    spos = cell.scaled_positions(refpos)
+    keep = (abs(spos[:, :2]) <= 1).all(axis=1)
+    indices = np.tile(np.arange(len(structure)), len(images))[keep]
+    rel_struc = structure[indices]
+    rel_struc.set_positions(relpos[keep])
     rel_struc.set_cell(cell)
-
-    # create intermediate big structure for the unrelaxed structure
-    ref_struc = unrelaxed.repeat((5, 5, 1))
-    positions = ref_struc.get_positions()
-    positions += [-translation[0], -translation[1], 0]
-    positions += -2.0 * scell[0] - 1.0 * scell[1]
-    # positions += (0.5 + delta) * cell[0] + (0.5 + delta) * cell[1]
-    ref_struc.set_positions(positions)
+    ref_struc = unrelaxed[indices]
+    ref_struc.set_positions(refpos[keep])
     ref_struc.set_cell(cell)
 
     refpos = reference.get_positions()
     refpos += [-translation[0], -translation[1], 0]
     # refpos += (0.5 + delta) * cell[0] + (0.5 + delta) * cell[1]
-    reference.set_positions(refpos)
-    reference.wrap()
+    reference.set_positions(wrap_positions(refpos, cell, pbc=reference.pbc))
 
     return rel_struc, ref_struc, reference, N
 
 
+def get_mapping_images(atoms, scell, cell, shift):
+    """Return the in-plane images of 'scell' needed to cover the mapping window.
+
+    The window contains all positions with in-plane scaled coordinates
+    (with respect to 'cell') within [-1, 1]. An image is returned if any
+    atom of 'atoms', translated by 'shift', may end up in the window.
+    """
+    spos = cell.scaled_positions(atoms.get_positions() + shift)[:, :2]
+    # in-plane scaled coordinates of the two in-plane supercell vectors
+    A = cell.scaled_positions(np.asarray(scell)[:2])[:, :2].T
+    Ainv = np.linalg.inv(A)
+    centers = -spos @ Ainv.T
+    halfwidths = abs(Ainv).sum(axis=1)
+    lower = np.floor((centers - halfwidths).min(axis=0)).astype(int)
+    upper = np.ceil((centers + halfwidths).max(axis=0)).astype(int)
+
+    return np.array([[i, j, 0]
+                     for i in range(lower[0], upper[0] + 1)
+                     for j in range(lower[1], upper[1] + 1)])
+
+
+def get_tiled_positions(atoms, cell, images):
+    """Return positions of 'atoms' translated by the given images of 'cell'.
+
+    The ordering is the same as for atoms.repeat, but only the requested
+    images are created.
+    """
+    shifts = images @ np.asarray(cell)
+
+    return (atoms.get_positions()[None] + shifts[:, None]).reshape(-1, 3)
+
+
 def apply_shift(atoms, delta=0):
     newatoms = atoms.copy()
     positions = newatoms.get_positions()
@@ -707,25 +748,22 @@ def get_supercell_shape(primitive, pristine):
     """
     N = len(pristine) / len(primitive)
     N = int(np.floor(np.sqrt(N)))
-    reconstruct = primitive.copy()
-    reconstruct = reconstruct.repeat((N, N, 1))
-    rcell = reconstruct.get_cell()
-    pcell = pristine.get_cell()
+    primdiag = primitive.get_cell().diagonal()
+    prisdiag = pristine.get_cell().diagonal()
 
     for size in range(N, 0, -1):
-        suits = True
-        reconstruct = primitive.repeat((size, size, 1))
-        rcell = reconstruct.get_cell()
-        for i in range(3):
-            if rcell[i, i] > pcell[i, i]:
-                suits = False
-                break
-        if suits:
+        # diagonal of the cell of primitive.repeat((size, size, 1))
+        rdiag = primdiag * [size, size, 1]
+        if (rdiag <= prisdiag).all():
             return size
 
     return size
 
 
+# band and spin index in cube file names, e.g. wf.12_0.cube
+CUBEFILE_PATTERN = re.compile(r'wf\.(\d+)_(\d+)\.cube$')
+
+
 class WFCubeFile:
     """Class containing functionalities about WFs and file I/O."""
 
@@ -739,11 +777,13 @@ class WFCubeFile:
 
     @classmethod
     def fromfilename(cls, filename):
-        band_spin = filename.split('.')[1]
-        band = int(band_spin.split('_')[0])
-        spin = int(band_spin.split('_')[1])
+        match = CUBEFILE_PATTERN.search(filename)
+        if match is None:
+            raise ValueError(f'{filename} is not a wf.{{band}}_{{spin}}.cube '
+                             'file!')
+        band, spin = match.groups()
 
-        return cls(spin=spin, band=band)
+        return cls(spin=int(spin), band=int(band))
 
     @property
     def filename(self):
@@ -776,26 +816,28 @@ class DefectInfo:
         assert not (defectpath is not None and defecttoken is not None), (
             'please give either defectpath or defecttoken as an input, not both!')
         if defectpath is not None:
-            self.names, self.specs = self._defects_from_path_or_token(
-                defectpath=defectpath)
-            self.defecttoken = self._defect_token_from_path(defectpath)
+            tokens = self._defect_tokens_from_path(defectpath)
+            self.names, self.specs = self._defects_from_tokens(tokens)
+            self.defecttoken = ".".join(tokens)
         elif defecttoken is not None:
             self.names, self.specs = self._defects_from_path_or_token(
                 defecttoken=defecttoken)
 
-    def _defect_token_from_path(self, defectpath):
-        complete_defectpath = Path(defectpath.absolute())
-        dirname = complete_defectpath.parent.name
-        return ".".join(dirname.split('.')[2:])
+    def _defect_tokens_from_path(self, defectpath):
+        """Return the dot-separated defect tokens of the defect folder."""
+        dirname = Path(defectpath.absolute()).parent.name
+        return dirname.split('.')[2:]
 
     def _defects_from_path_or_token(self, defectpath=None, defecttoken=None):
         """Return defecttype, and kind."""
         if defectpath is not None:
-            complete_defectpath = Path(defectpath.absolute())
-            dirname = complete_defectpath.parent.name
-            defecttoken = dirname.split('.')[2:]
+            defecttoken = self._defect_tokens_from_path(defectpath)
         elif defecttoken is not None:
             defecttoken = defecttoken.split('.')
+
+        return self._defects_from_tokens(defecttoken)
+
+    def _defects_from_tokens(self, defecttoken):
         if len(defecttoken) >= 2:
             defects = defecttoken[:-1]
             specs_str = defecttoken[-1].split('-')
@@ -848,6 +890,11 @@ def draw_band_edge(energy, edge, color, *, offset=2, ax):
             va='center', fontsize=12)
 
 
+# side (sign of the x-shift) and alignment of level labels for each spin
+LABEL_POSITIONS = {0: (-1, 'right'),
+                   1: (1, 'left')}
+
+
 class Level:
     """Class to draw a single defect state level in the gap."""
 
@@ -873,10 +920,16 @@ class Level:
 
         return relpos
 
+    @property
+    def segment(self):
+        """Return the end points of the line representing the state."""
+        return [(self.relpos - self.size, self.energy),
+                (self.relpos + self.size, self.energy)]
+
     def draw(self):
         """Draw the defect state according to spin and degeneracy."""
-        pos = [self.relpos - self.size, self.relpos + self.size]
-        self.ax.plot(pos, [self.energy] * 2, '-k')
+        (x0, y0), (x1, y1) = self.segment
+        self.ax.plot([x0, x1], [y0, y1], '-k')
 
     def add_occupation(self, length):
         """Draw an arrow if the defect state if occupied."""
@@ -894,24 +947,13 @@ class Level:
         labelcolor = 'C3'
         if static is None:
             labelstr = label.lower()
-            splitstr = list(labelstr)
-            if len(splitstr) == 2:
-                labelstr = f'{splitstr[0]}$_{splitstr[1]}$'
+            if len(labelstr) == 2:
+                labelstr = f'{labelstr[0]}$_{labelstr[1]}$'
         else:
             labelstr = 'a'
 
-        if (self.off == 0 and self.spin == 0):
-            xpos = self.relpos - self.size - shift
-            ha = 'right'
-        if (self.off == 0 and self.spin == 1):
-            xpos = self.relpos + self.size + shift
-            ha = 'left'
-        if (self.off == 1 and self.spin == 0):
-            xpos = self.relpos - self.size - shift
-            ha = 'right'
-        if (self.off == 1 and self.spin == 1):
-            xpos = self.relpos + self.size + shift
-            ha = 'left'
+        sign, ha = LABEL_POSITIONS[self.spin]
+        xpos = self.relpos + sign * (self.size + shift)
         self.ax.text(xpos,
                      self.energy,
                      labelstr,
@@ -920,6 +962,32 @@ class Level:
                      color=labelcolor)
 
 
+class DegeneracyCounter:
+    """Class to keep track of the offsets of degenerate states.
+
+    If two degenerate states follow after each other, the first one will
+    be drawn on the left side (offset 0) and the second one on the right
+    side (offset 1). Since we only deal with doubly degenerate states here,
+    the counter starts over after the second degenerate state.
+
+    For non degenerate states, i.e. deg = 1, the offset is not changed.
+    Without a symmetry analysis (levelflag is False) there are no
+    degenerate states and the offset is always one.
+    """
+
+    def __init__(self, levelflag):
+        self.counter = 0
+        self.offset = 0 if levelflag else 1
+
+    def step(self, deg):
+        """Return the offset of the next state with degeneracy deg."""
+        if deg == 2:
+            self.offset = self.counter
+            self.counter ^= 1
+
+        return self.offset
+
+
 def plot_gapstates(row, fname):
     from matplotlib import pyplot as plt
 
@@ -940,11 +1008,14 @@ def plot_gapstates(row, fname):
     draw_band_edge(ecbm, 'cbm', 'C1', offset=gap / 5, ax=ax)
 
     levelflag = data.symmetries[0].best is not None
+    symmetries = data.data['symmetries']
+    spins, energies, degs = get_level_arrays(symmetries, levelflag)
+    is_inside_gap = (evbm < energies) & (energies < ecbm)
     # draw the levels with occupations, and labels for both spins
-    for spin in [0, 1]:
-        spin_data = get_spin_data(data, spin)
-        draw_levels_occupations_labels(ax, spin, spin_data, ecbm, evbm,
-                                       ef, gap, levelflag)
+    indices = np.flatnonzero(is_inside_gap & np.isin(spins, [0, 1]))
+    gapstates = [symmetries[i] for i in indices]
+    draw_levels_occupations_labels(ax, gapstates, spins[indices],
+                                   degs[indices], ef, gap, levelflag)
 
     ax1 = ax.twinx()
     ax.set_xlim(0, 1)
@@ -961,70 +1032,55 @@ def plot_gapstates(row, fname):
     plt.close()
 
 
-def get_spin_data(data, spin):
-    """Create symmetry result only containing entries for one spin channel."""
-    spin_data = []
-    for sym in data.data['symmetries']:
-        if int(sym.spin) == spin:
-            spin_data.append(sym)
+def get_level_arrays(symmetries, levelflag):
+    """Return spin, energy and degeneracy of all states as arrays.
+
+    Degeneracies are only evaluated if there is a symmetry analysis
+    (levelflag), otherwise all states are treated as non-degenerate.
+    """
+    spins = np.array([int(sym.spin) for sym in symmetries], dtype=int)
+    energies = np.array([sym.energy for sym in symmetries], dtype=float)
+    if levelflag:
+        degs = np.array([2 if 'E' in (sym.best or '') else 1
+                         for sym in symmetries], dtype=int)
+    else:
+        degs = np.ones(len(symmetries), dtype=int)
 
-    return spin_data
+    return spins, energies, degs
 
 
-def draw_levels_occupations_labels(ax, spin, spin_data, ecbm, evbm, ef,
+def draw_levels_occupations_labels(ax, gapstates, spins, degs, ef,
                                    gap, levelflag):
     """Loop over all states in the gap and plot the levels.
 
-    This function loops over all states in the gap of a given spin
-    channel, and dravs the states with labels. If there are
-    degenerate states, it makes use of the degeneracy_counter, i.e. if two
-    degenerate states follow after each other, one of them will be drawn
-    on the left side (degoffset=0, degeneracy_counter=0), the degeneracy
-    counter will be increased by one and the next degenerate state will be
-    drawn on the right side (degoffset=1, degeneracy_counter=1). Since we
-    only deal with doubly degenerate states here, the degeneracy counter
-    will be set to zero again after drawing the second degenerate state.
-
-    For non degenerate states, i.e. deg = 1, all states will be drawn
-    in the middle and the counter logic is not needed.
+    This function loops over all states in the gap (gapstates, with
+    spins and degeneracies degs) of both spin channels, and dravs the
+    states with labels. The side on which degenerate states are drawn is
+    tracked with one DegeneracyCounter per spin channel.
     """
-    # initialize degeneracy counter and offset
-    degeneracy_counter = 0
-    degoffset = 0
-    for sym in spin_data:
+    from matplotlib.collections import LineCollection
+
+    counters = [DegeneracyCounter(levelflag), DegeneracyCounter(levelflag)]
+    # collect the level lines and draw them with a single collection
+    segments = []
+    for sym, spin, deg in zip(gapstates, spins, degs):
         energy = sym.energy
-        is_inside_gap = evbm < energy < ecbm
-        if is_inside_gap:
-            spin = int(sym.spin)
-            irrep = sym.best
-            # only do drawing left and right if levelflag, i.e.
-            # if there is a symmetry analysis to evaluate degeneracies
-            if levelflag:
-                deg = [1, 2]['E' in irrep]
-            else:
-                deg = 1
-                degoffset = 1
-            # draw draw state on the left hand side
-            if deg == 2 and degeneracy_counter == 0:
-                degoffset = 0
-                degeneracy_counter = 1
-            # draw state on the right hand side, set counter to zero again
-            elif deg == 2 and degeneracy_counter == 1:
-                degoffset = 1
-                degeneracy_counter = 0
-            # intitialize and draw the energy level
-            lev = Level(energy, ax=ax, spin=spin, deg=deg,
-                        off=degoffset)
-            lev.draw()
-            # add occupation arrow if level is below E_F
-            if energy <= ef:
-                lev.add_occupation(length=gap / 15.)
-            # draw label based on irrep
-            if levelflag:
-                static = None
-            else:
-                static = 'A'
-            lev.add_label(irrep, static=static)
+        irrep = sym.best
+        # intitialize and draw the energy level
+        lev = Level(energy, ax=ax, spin=spin, deg=deg,
+                    off=counters[spin].step(deg))
+        segments.append(lev.segment)
+        # add occupation arrow if level is below E_F
+        if energy <= ef:
+            lev.add_occupation(length=gap / 15.)
+        # draw label based on irrep
+        if levelflag:
+            static = None
+        else:
+            static = 'A'
+        lev.add_label(irrep, static=static)
+
+    ax.add_collection(LineCollection(segments, colors='k'))
 
 
 def check_and_return_input(structurefile='', unrelaxedfile='NO',
@@ -1,8 +1,13 @@
 """Defect formation energies."""
+import logging
+import os
+from functools import lru_cache
 from typing import Union
 from asr.core import command, option, ASRResult
 
 
+logger = logging.getLogger(__name__)
+
 group = 'property'
 creates = []  # what files are created
 
@@ -57,27 +62,15 @@ def main(pristine: str = 'gs.gpw', defect: str = 'gs.gpw',
         epsilon = [(epsilons[0] + epsilons[1]) / 2., epsilons[2]]
         dim = '2d'
 
-    folder_list = []
-    p = Path('.')
-
     # Either run for all defect folders or just a specific one
-    if defect_name is None:
-        [folder_list.append(x) for x in p.iterdir() if x.is_dir()
-            and not x.name == 'pristine_sc']
-    else:
-        [folder_list.append(x) for x in p.iterdir() if x.is_dir()
-            and x.name == defect_name]
-
-    for folder in folder_list:
-        s = Path(folder.name)
-        sub_folder_list = []
-        [sub_folder_list.append(x) for x in s.iterdir() if x.is_dir()]
+    for folder in iter_defect_folders(defect_name):
+        sub_folder_list = [x for x in Path(folder).iterdir() if x.is_dir()]
         e_form = []
         # e_fermi = []
         charges = []
         # e_fermi_calc = []
         for sub_folder in sub_folder_list:
-            sub_folder_path = folder.name + '/' + sub_folder.name
+            sub_folder_path = folder + '/' + sub_folder.name
             setup_params = read_json(sub_folder_path + '/params.json')
             chargestate = setup_params.get('charge')
             charged_file = find_file_in_folder('gs.gpw',
@@ -95,8 +88,8 @@ def main(pristine: str = 'gs.gpw', defect: str = 'gs.gpw',
             # calc = GPAW(find_file_in_folder('gs.gpw', sub_folder_path))
             # e_fermi_calc.append(calc.get_fermi_level())
             # e_fermi.append(0)
-        defectformation_dict[folder.name] = {'formation_energies': e_form,
-                                             'chargestates': charges}
+        defectformation_dict[folder] = {'formation_energies': e_form,
+                                        'chargestates': charges}
         # 'fermi_energies_c': e_fermi_calc
         # 'fermi_energies': e_fermi,
     write_json('defectformation.json', defectformation_dict)
@@ -104,6 +97,23 @@ def main(pristine: str = 'gs.gpw', defect: str = 'gs.gpw',
     return None
 
 
+def iter_defect_folders(defect_name=None):
+    """Yield the names of the defect folders in the current directory.
+
+    If defect_name is given, only a folder of that name is yielded. The
+    folders are yielded while the directory is scanned, and DirEntry
+    caches the file type, so no extra stat call is needed per folder.
+    """
+    with os.scandir('.') as entries:
+        for entry in entries:
+            if defect_name is None:
+                is_defect = entry.name != 'pristine_sc'
+            else:
+                is_defect = entry.name == defect_name
+            if is_defect and entry.is_dir():
+                yield entry.name
+
+
 def check_and_get_general_inputs():
     """Determine whether all necessary files exist.
 
@@ -124,16 +134,15 @@ def check_and_get_general_inputs():
     q = gen_params.get('chargestates')
     epsilons = params_eps.get('local_field')
     if q is not None and epsilons is not None:
-        msg = 'INFO: number of chargestates and dielectric constant '
-        msg += 'extracted: q = {}, eps = {}'.format(q, epsilons)
-        print(msg)
+        logger.info('number of chargestates and dielectric constant '
+                    'extracted: q = %s, eps = %s', q, epsilons)
     else:
         msg = 'either number of chargestates and/or dielectric '
         msg += 'constant of the host material could not be extracted'
         raise ValueError(msg)
 
     if path_gs is not None:
-        print('INFO: check of general inputs successful')
+        logger.info('check of general inputs successful')
 
     return q, epsilons, path_gs
 
@@ -142,8 +151,22 @@ def find_file_in_folder(filename, foldername):
     """Find a specific file in folder.
 
     Finds a specific file within a folder starting from your current
-    position in the directory tree.
+    position in the directory tree. Lookups are cached per working
+    directory, use clear_find_cache() if the directory tree changed in
+    between.
     """
+    return _find_file_in_folder(os.getcwd(), filename, foldername)
+
+
+def clear_find_cache():
+    """Forget all cached find_file_in_folder lookups."""
+    _find_file_in_folder.cache_clear()
+
+
+@lru_cache(maxsize=None)
+def _find_file_in_folder(cwd, filename, foldername):
+    # cwd is only part of the cache key, the search itself is relative to
+    # the current directory which is cwd on a cache miss
     from pathlib import Path
 
     p = Path('.')
@@ -152,38 +175,38 @@ def find_file_in_folder(filename, foldername):
     # check in current folder directly if no folder specified
     if foldername is None:
         check_empty = True
-        tmp_list = list(p.glob(filename))
+        if any(char in filename for char in '*?['):
+            tmp_list = list(p.glob(filename))
+        else:
+            # a literal filename only needs a single stat call
+            tmp_list = [Path(filename)] if Path(filename).exists() else []
         if len(tmp_list) == 1:
             file_path = tmp_list[0]
-            print('INFO: found {0}: {1}'.format(filename,
-                                                file_path.absolute()))
+            logger.info('found %s: %s', filename, file_path.absolute())
             find_success = True
         else:
-            print('ERROR: no unique {} found in this directory'.format(
-                filename))
+            logger.error('no unique %s found in this directory', filename)
     else:
-        tmp_list = list(p.glob('**/' + foldername))
+        tmp_list = [Path(folder) for folder in find_folders(foldername)]
         check_empty = False
     # check sub_folders
     if len(tmp_list) == 1 and not check_empty:
-        file_list = list(p.glob(foldername + '/**/' + filename))
+        file_list = find_files(filename, str(tmp_list[0]))
         if len(file_list) == 1:
-            file_path = file_list[0]
-            print('INFO: found {0} in {1}: {2}'.format(
-                filename, foldername, file_path.absolute()))
+            file_path = Path(file_list[0])
+            logger.info('found %s in %s: %s',
+                        filename, foldername, file_path.absolute())
             find_success = True
         elif len(file_list) == 0:
-            print('ERROR: no {} found in this directory'.format(
-                filename))
+            logger.error('no %s found in this directory', filename)
         else:
-            print('ERROR: several {0} files in directory tree: {1}'.format(
-                filename, tmp_list[0].absolute()))
+            logger.error('several %s files in directory tree: %s',
+                         filename, tmp_list[0].absolute())
     elif len(tmp_list) == 0 and not check_empty:
-        print('ERROR: no {0} found in this directory tree'.format(
-            foldername))
+        logger.error('no %s found in this directory tree', foldername)
     elif not check_empty:
-        print('ERROR: several {0} folders in directory tree: {1}'.format(
-            foldername, p.absolute()))
+        logger.error('several %s folders in directory tree: %s',
+                     foldername, p.absolute())
 
     if not find_success:
         file_path = None
@@ -191,6 +214,50 @@ def find_file_in_folder(filename, foldername):
     return str(file_path.absolute())
 
 
+def walk_folders(top):
+    """Yield top and all folders below it, depth first.
+
+    Symbolic links to folders are not followed.
+    """
+    stack = [top]
+    while stack:
+        folder = stack.pop()
+        yield folder
+        with os.scandir(folder) as entries:
+            stack.extend(entry.path for entry in entries
+                         if entry.is_dir(follow_symlinks=False))
+
+
+def find_folders(foldername, top='.', maxcount=2):
+    """Return up to maxcount folders below top that end with foldername.
+
+    The walk stops once maxcount folders are found, since two matches are
+    enough to know that the folder is not unique.
+    """
+    suffix = os.sep + os.path.normpath(foldername)
+    matches = []
+    for folder in walk_folders(top):
+        if (os.sep + os.path.normpath(folder)).endswith(suffix):
+            matches.append(folder)
+            if len(matches) == maxcount:
+                break
+
+    return matches
+
+
+def find_files(filename, top, maxcount=2):
+    """Return up to maxcount paths of files called filename below top."""
+    matches = []
+    for folder in walk_folders(top):
+        path = os.path.join(folder, filename)
+        if os.path.isfile(path):
+            matches.append(path)
+            if len(matches) == maxcount:
+                break
+
+    return matches
+
+
 def collect_data():
     # from ase.io import jsonio
     # from pathlib import Path
@@ -218,35 +285,13 @@ def collect_data():
 #     for element in formation_dict:
 #         if element != 'gaps_soc' and element != 'gaps_nosoc':
 #             print(element)
-#             plotname = element
 #             defect_dict = formation_dict[element]
-#             transitions_dict[plotname] = plot_formation_and_transitions(
-#                 defect_dict, plotname, gap)
+#             transitions_dict[element] = compute_transitions(
+#                 defect_dict, gap)
 #
 #     return transitions_dict
 
 
-def line_intersection(line1, line2):
-    """Get intersection between two lines.
-
-    Helper function to calculate intersection of two given lines.
-    """
-    xdiff = (line1[0][0] - line1[1][0], line2[0][0] - line2[1][0])
-    ydiff = (line1[0][1] - line1[1][1], line2[0][1] - line2[1][1])
-
-    def det(a, b):
-        return a[0] * b[1] - a[1] * b[0]
-
-    div = det(xdiff, ydiff)
-    if div == 0:
-        raise Exception('lines do not intersect')
-
-    d = (det(*line1), det(*line2))
-    x = det(d, xdiff) / div
-    y = det(d, ydiff) / div
-    return x, y
-
-
 def line(p1, p2):
     """Define a line between p1 and p2.
 
@@ -258,47 +303,126 @@ def line(p1, p2):
     return A, B, -C
 
 
-def intersection(L1, L2):
-    """Get intersection between two lines L1 and L2.
+def intersections(L1, lines):
+    """Get intersections between line L1 and each line in lines.
 
-    Helper function to calculate intersection of two given lines that were
-    defined with the upper 'line' function.
+    Helper function for lines that were defined with the upper 'line'
+    function, with lines given as an (N, 3) array of coefficients. Returns
+    an (N, 2) array of intersection points, which are NaN for lines
+    parallel to L1.
     """
-    D = L1[0] * L2[1] - L1[1] * L2[0]
-    Dx = L1[2] * L2[1] - L1[1] * L2[2]
-    Dy = L1[0] * L2[2] - L1[2] * L2[0]
-    if D != 0:
-        x = Dx / D
-        y = Dy / D
-        return x, y
-    else:
-        return False
+    import numpy as np
 
+    lines = np.asarray(lines, dtype=float)
+    D = L1[0] * lines[:, 1] - L1[1] * lines[:, 0]
+    Dx = L1[2] * lines[:, 1] - L1[1] * lines[:, 2]
+    Dy = L1[0] * lines[:, 2] - L1[2] * lines[:, 0]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        points = np.column_stack([Dx / D, Dy / D])
+    points[D == 0] = np.nan
 
-def plot_formation_and_transitions(defect_dict, defectname, gap):
-    """XXX: Do me.
+    return points
 
-    Function to plot formation energies versus the Fermi energy and to
-    obtain transition points between most stable charge states of a given
-    defect
+
+def get_formation_lines(defect_dict, gap):
+    """Return charge states and formation energies at the band edges.
+
+    The formation energies of all charge states are evaluated at the
+    valence band maximum (first column) and the conduction band minimum
+    (second column) of the pristine material.
     """
-    # from asr.utils import write_json
-    import matplotlib.pyplot as plt
     import numpy as np
 
     # initalize and read formation energies and charge states
-    x = []
-    y = []
-    q = []
     x = np.array(defect_dict['fermi_energies'])
     y = np.array(defect_dict['formation_energies'])
     q = np.array(defect_dict['chargestates'])
 
-    # set general parameters
+    # the edges of all lines are evaluated at once
+    x_range = np.array([0, gap])
+    x_diff = np.column_stack([-x, x_range[1] - x])
+    y_edges = y[:, None] + x_diff * q[:, None]
+
+    return q, y_edges
+
+
+def compute_transitions(defect_dict, gap, lines=None):
+    """Obtain transition points between the most stable charge states.
+
+    Returns an (N, 2) float array with the (x, y) coordinates of the
+    transition points and an (N, 2) integer array with the charge states
+    on either side of them. The first and last rows hold the most stable
+    charge states at the band edges. lines can be the output of
+    get_formation_lines if the caller already has it.
+    """
+    import numpy as np
+
+    if lines is None:
+        lines = get_formation_lines(defect_dict, gap)
+    q, y_edges = lines
+    x_range = np.array([0, gap])
+
+    # initialise array containing the coefficients (A, B, C) of all lines
+    linearray = np.column_stack(np.broadcast_arrays(
+        *line([x_range[0], y_edges[:, 0]], [x_range[1], y_edges[:, 1]])))
+
+    # flip arrays in order for them to start with positive slope
+    linearray_up = np.flip(linearray, axis=0)
+    y_edges = np.flip(y_edges, axis=0)
+    q_copy = np.flip(q)
+
+    # IMPORTANT: all of the important arrays have now been reversed!
+    # find minimum line at zero energy and create temporary array with lines.
+    # Leading lines are dropped by slicing, which only creates views of the
+    # arrays instead of reallocating them. The coordinates and charge states
+    # of the transitions are collected separately
+    i = np.argmin(y_edges[:, 0])
+    linearray_up = linearray_up[i:]
+    trans_xy = [(0, y_edges[i][0])]
+    trans_q = [(q_copy[i], q_copy[i])]
+    q_copy = q_copy[i:]
+
+    # loop over all lines in linearray_up and calculate intersection points
+    while len(linearray_up) > 1:
+        points = intersections(linearray_up[0], linearray_up[1:])
+        q0 = q_copy[0]
+        q_copy = q_copy[1:]
+        linearray_up = linearray_up[1:]
+        x_min = np.inf
+        for n, (x, y) in enumerate(points):
+            x_min = min(x_min, x)
+            if x >= 0 and n == 0:
+                trans_xy.append((x, y))
+                trans_q.append((q0, q_copy[n]))
+                dropout = n
+            elif x >= 0 and x == x_min and x < trans_xy[-1][0]:
+                trans_xy[-1] = (x, y)
+                trans_q[-1] = (q0, q_copy[n])
+                dropout = n
+        # equivalent to deleting the first i lines for all i < dropout
+        linearray_up = linearray_up[dropout * (dropout - 1) // 2:]
+    trans_xy.append((x_range[1], y_edges[:, 1].min()))
+    trans_q.append((trans_q[-1][1], trans_q[-1][1]))
+
+    return np.array(trans_xy, dtype=float), np.array(trans_q, dtype=int)
+
+
+def plot_formation_and_transitions(defect_dict, defectname, gap):
+    """Plot formation energies and transition points of a defect.
+
+    Function to plot formation energies versus the Fermi energy and to
+    obtain transition points between most stable charge states of a given
+    defect. Use compute_transitions if only the transition points are
+    needed.
+    """
+    # from asr.utils import write_json
+    import matplotlib.pyplot as plt
+    import numpy as np
+
+    q, y_edges = get_formation_lines(defect_dict, gap)
+    trans_xy, trans_q = compute_transitions(defect_dict, gap,
+                                            lines=(q, y_edges))
     x_range = np.array([0, gap])
-    x_diff = np.array([[-x[0], x_range[1] - x[0]]])
-    y_edges = np.array(
-        [[y[0] + x_diff[0][0] * q[0], y[0] + x_diff[0][1] * q[0]]])
 
     # set general plotting parameters
     plt.figure()
@@ -310,27 +434,18 @@ def plot_formation_and_transitions(defect_dict, defectname, gap):
     plt.xlim(x_range[0] - 0.1 * gap, x_range[1] + 0.1 * gap)
     # bbox = {'fc': '0.8', 'pad': 0}
 
-    # initialise np array containing all lines
-    linearray = np.array([[line([x_range[0], y_edges[0][0]],
-                                [x_range[1], y_edges[0][1]]), q[0]]])
-
     # initialise plot
     plt.plot(x_range, y_edges[0], color=colorlist[np.sign(q[0])], lw=lw,
              linestyle=linestylelist[abs(q[0])], label='q = {}'.format(q[0]))
     plt.text((2 * x_range[0] - 0.1 * gap) / 2.,
-             max(y_edges[:, 0]) * 1.1 / 2., 'valence band',
+             y_edges[0, 0] * 1.1 / 2., 'valence band',
              {'ha': 'center', 'va': 'center'}, rotation=90)
     plt.text((2 * x_range[1] + 0.1 * gap) / 2.,
-             max(y_edges[:, 0]) * 1.1 / 2., 'conduction band',
+             y_edges[0, 0] * 1.1 / 2., 'conduction band',
              {'ha': 'center', 'va': 'center'}, rotation=90)
 
-    # append other lines in a loop
+    # plot other lines in a loop
     for i in range(1, len(q)):
-        x_diff = np.append(x_diff, [[-x[i], x_range[1] - x[i]]], axis=0)
-        y_edges = np.append(y_edges, [[y[i] + x_diff[i][0] * q[i],
-                                       y[i] + x_diff[i][1] * q[i]]], axis=0)
-        linearray = np.append(linearray, [[line([x_range[0], y_edges[i][0]], [
-                              x_range[1], y_edges[i][1]]), q[i]]], axis=0)
         plt.plot(x_range,
                  y_edges[i],
                  color=colorlist[np.sign(q[i])],
@@ -338,66 +453,15 @@ def plot_formation_and_transitions(defect_dict, defectname, gap):
                  linestyle=linestylelist[abs(q[i])],
                  label='q = {}'.format(q[i]))
 
-    # flip arrays in order for them to start with positive slope
-    linearray_up = np.flip(linearray, axis=0)
-    x_diff = np.flip(x_diff, axis=0)
-    y_edges = np.flip(y_edges, axis=0)
-    q_copy = np.flip(q)
-
-    # IMPORTANT: all of the important arrays have now been reversed!
-    # find minimum line at zero energy and create temporary array with lines
-    for i in range(len(y_edges)):
-        if y_edges[i][0] == min(y_edges[:, 0]):
-            # start_index = i
-            linearray_up = np.delete(linearray_up, np.s_[0:i], 0)
-            trans_array = np.array(
-                [[(0, y_edges[i][0]), q_copy[i], q_copy[i]]])
-            q_copy = np.delete(q_copy, np.s_[0:i])
-
-    # loop over all lines in linearray_up and calculate intersection points
-    while len(linearray_up) > 1:
-        linedists = np.array([[intersection(linearray_up[0][0],
-                                            linearray_up[1][0]),
-                              q_copy[0], q_copy[1]]])
-        if len(linearray_up) > 2:
-            for j in range(2, len(linearray_up)):
-                linedists = np.append(linedists, [[intersection(
-                    linearray_up[0][0], linearray_up[j][0]), q_copy[0],
-                    q_copy[j]]], axis=0)
-        linearray_up = np.delete(linearray_up, 0, 0)
-        q_copy = np.delete(q_copy, 0)
-        x_list = []
-        n = 0
-        for element in linedists:
-            x_list.append(element[0][0])
-            if element[0][0] >= 0 and len(x_list) == 1:
-                if element[0][0] == min(x_list):
-                    trans_array = np.append(trans_array, [element], axis=0)
-                    dropout = n
-            elif (element[0][0] >= 0 and element[0][0] == min(x_list)
-                  and element[0][0] < trans_array[-1][0][0]):
-                trans_array = np.append(trans_array, [element], axis=0)
-                trans_array = np.delete(trans_array, -2, 0)
-                dropout = n
-            n = n + 1
-        for i in range(dropout):
-            linearray_up = np.delete(linearray_up, np.s_[0:i], 0)
-    for i in range(len(y_edges)):
-        if y_edges[i][1] == min(y_edges[:, 1]):
-            trans_array = np.append(trans_array, [[(x_range[1], y_edges[i][1]),
-                                                   trans_array[-1][2],
-                                                   trans_array[-1][2]]],
-                                    axis=0)
-
     # plot the results and save the figure
-    for element in trans_array:
-        ratio = element[0][1] / max(y_edges[:, 0])
-        plt.axvline(x=element[0][0], ymax=ratio, color='C3',
+    ratios = trans_xy[:, 1] / y_edges[:, 0].max()
+    for x_val, ratio in zip(trans_xy[:, 0], ratios):
+        plt.axvline(x=x_val, ymax=ratio, color='C3',
                     linestyle=(0, (5, 10)))
     plt.axvspan(x_range[0] - 0.1 * gap, x_range[0], color='lightgrey')
     plt.axvspan(x_range[1] + 0.1 * gap, x_range[1], color='lightgrey')
-    x_val = [x[0] for x in trans_array[:, 0]]
-    y_val = [x[1] for x in trans_array[:, 0]]
+    x_val = trans_xy[:, 0]
+    y_val = trans_xy[:, 1]
     # plt.plot(x_val, y_val, marker='D', linestyle='-', color='C3')
     plt.plot(x_val, y_val, marker='D', linestyle='', color='C3')
     plt.xlabel(r'$E_{F}$ in eV')
@@ -406,7 +470,7 @@ def plot_formation_and_transitions(defect_dict, defectname, gap):
     plt.legend()
     plt.savefig(plotname)
 
-    return trans_array
+    return trans_xy, trans_q
 
 
 # def webpanel(result, row, key_descriptions):
@@ -4,6 +4,7 @@ from asr.database.browser import WebPanel, table
 from asr.database.material_fingerprint import main as material_fingerprint
 from asr.defect_symmetry import DefectInfo
 from pathlib import Path
+import os
 import typing
 
 
@@ -79,24 +80,30 @@ def main() -> Result:
     make sure to change the 'basepath' variable in the webpanel function
     according to the location of your database.
     """
-    # extract path of current directory
-    p = Path('.')
+    # extract the absolute paths of the defect folder and of the folder
+    # containing all defects of the host material
+    defectpath = Path('.').absolute().parent
+    hostpath = defectpath.parent
 
     # First, get charged links for the same defect system
     chargedlinks = []
-    chargedlist = list(p.glob('./../charge_*'))
-    for charged in chargedlist:
-        chargedlinks = get_list_of_links(charged)
+    for charged in get_subfolders(defectpath, 'charge_'):
+        chargedlinks.extend(get_list_of_links(charged))
 
-    # Second, get the neutral links of systems in the same host
+    # Second, get the neutral links of systems in the same host, and find
+    # the pristine material within the same scan of the host folder
     neutrallinks = []
-    neutrallist = list(p.glob('./../../*/charge_0'))
-    for neutral in neutrallist:
-        neutrallinks = get_list_of_links(neutral)
+    pristines = []
+    for folder in get_subfolders(hostpath):
+        if folder.name.startswith('defects.pristine_sc'):
+            pristines.append(folder)
+        neutral = folder / 'charge_0'
+        if neutral.is_dir():
+            neutrallinks.extend(get_list_of_links(neutral))
 
     # Third, the pristine material
     pristinelinks = []
-    pristine = list(p.glob('./../../defects.pristine_sc*'))[0]
+    pristine = pristines[0]
     if (Path(pristine / 'structure.json').is_file()):
         uid = get_uid_from_fingerprint(pristine)
         pristinelinks.append((uid, 'pristine material'))
@@ -107,7 +114,16 @@ def main() -> Result:
         pristinelinks=pristinelinks)
 
 
+def get_subfolders(path, prefix=''):
+    """Return all folders in path whose name starts with prefix."""
+    with os.scandir(path) as entries:
+        return [Path(entry.path) for entry in entries
+                if entry.name.startswith(prefix) and entry.is_dir()]
+
+
 def get_list_of_links(path):
+    # make the path absolute once, the helpers below then reuse it as is
+    path = path.absolute()
     links = []
     structurefile = path / 'structure.json'
     charge = get_charge_from_folder(path)
@@ -123,7 +139,9 @@ def get_list_of_links(path):
 
 def get_uid_from_fingerprint(path):
     with chdir(path):
-        material_fingerprint()
+        # the fingerprint recipe is only run if it has no results yet
+        if not material_fingerprint.done:
+            material_fingerprint()
         res = read_json('results-asr.database.material_fingerprint.json')
         uid = res['uid']
 
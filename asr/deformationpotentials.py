@@ -196,8 +196,12 @@ def get_special_kpts(atoms):
     return labels, coords
 
 
-def get_relevant_kpts(calc, folder, soc):
-    """Include VBM and CBM into the k-point list."""
+def get_relevant_kpts(calc, folder, soc, edges=None):
+    """Include VBM and CBM into the k-point list.
+
+    edges are the band edges at the special points, as returned by
+    gpaw_get_edges. They are calculated here if not given.
+    """
     from ase.dft.bandgap import bandgap
 
     eigs, efermi = calc2eigs(calc, soc=soc)
@@ -225,13 +229,16 @@ def get_relevant_kpts(calc, folder, soc):
 
     labels, coords = get_special_kpts(calc.atoms)
     kpoints = {label: coord for label, coord in zip(labels, coords)}
-    edges = gpaw_get_edges('.', coords, soc)
+    if edges is None:
+        edges = gpaw_get_edges('.', coords, soc)
 
-    for i, e in enumerate(edges):
-        if e[0] > evbm or abs(e[0] - evbm) < 0.01:
-            kpoints['VBM'] = coords[i]
-        if e[1] < ecbm or abs(e[1] - ecbm) < 0.01:
-            kpoints['CBM'] = coords[i]
+    # use the last special point where an edge is found, if any
+    is_vbm = (edges[:, 0] > evbm) | (abs(edges[:, 0] - evbm) < 0.01)
+    is_cbm = (edges[:, 1] < ecbm) | (abs(edges[:, 1] - ecbm) < 0.01)
+    for label, is_edge in [('VBM', is_vbm), ('CBM', is_cbm)]:
+        indices = np.flatnonzero(is_edge)
+        if len(indices):
+            kpoints[label] = coords[indices[-1]]
 
     if 'VBM' not in kpoints.keys():
         kpoints['VBM'] = kpts[vbm[0]]
@@ -252,32 +259,71 @@ def gpaw_get_edges(folder, kpts, soc):
     Returns, for each k-point included in the calculation,
     the top eigenvalue of the valence band and
     the bottom eigenvalue of the conduction band."""
+    return gpaw_get_all_edges(folder, {soc: kpts})[soc]
+
+
+def gpaw_get_all_edges(folder, kpts_soc):
+    """Obtain the edge states with and without SOC from one calculation.
 
+    kpts_soc maps the SOC flags to the k-points of interest. A single
+    non-selfconsistent calculation is run on the union of all k-points, and
+    the band edges of each flag are extracted from it as in gpaw_get_edges.
+    Note that the Fermi level separating the bands is therefore determined
+    from the union of the k-points rather than from those of a single flag.
+    """
     from gpaw import GPAW
 
+    # map each distinct k-point to its index in the calculation
+    kptindices = {}
+    for kpts in kpts_soc.values():
+        for kpt in kpts:
+            kptindices.setdefault(tuple(kpt), len(kptindices))
+
     gpw = GPAW(f'{folder}/gs.gpw').fixed_density(
-        kpts=kpts,
+        kpts=list(kptindices),
         symmetry='off',
         txt=None
     )
     gpw.get_potential_energy()
-    all_eigs, efermi = calc2eigs(gpw, soc=soc)
     evac = evac_from_results(folder)
 
-    # This will take care of the spin polarization
-    if not soc:
-        all_eigs = np.hstack(all_eigs)
+    edges = {}
+    for soc, kpts in kpts_soc.items():
+        all_eigs, efermi = calc2eigs(gpw, soc=soc)
+
+        # This will take care of the spin polarization
+        if not soc:
+            all_eigs = np.hstack(all_eigs)
 
-    edges = np.zeros((len(all_eigs), 2))
-    for i, eigs_k in enumerate(all_eigs):
-        vb = [eig for eig in eigs_k if eig - efermi < 0]
-        cb = [eig for eig in eigs_k if eig - efermi > 0]
-        edges[i, 0] = max(vb)
-        edges[i, 1] = min(cb)
-    return edges - evac
+        indices = [kptindices[tuple(kpt)] for kpt in kpts]
+        edges[soc] = get_band_edges(all_eigs[indices], efermi) - evac
+    return edges
 
 
-def _main(pbc, kpts, get_edges, strain, soc):
+def get_band_edges(all_eigs, efermi):
+    """Return the highest occupied and lowest unoccupied eigenvalue.
+
+    all_eigs has the k-points along the first axis. The returned array has
+    the valence band edge in the first and the conduction band edge in the
+    second column. A ValueError is raised if there are no occupied or no
+    unoccupied eigenvalues at some k-point.
+    """
+    all_eigs = np.asarray(all_eigs)
+    vb = np.where(all_eigs < efermi, all_eigs, -np.inf).max(axis=1)
+    cb = np.where(all_eigs > efermi, all_eigs, np.inf).min(axis=1)
+    if np.isinf(vb).any() or np.isinf(cb).any():
+        raise ValueError('no occupied or unoccupied eigenvalues found '
+                         f'around the Fermi level {efermi}')
+    return np.stack([vb, cb], axis=1)
+
+
+def _main(pbc, kpts_soc, get_edges, strain):
+    """Calculate the deformation potentials for all SOC flags.
+
+    kpts_soc maps the SOC flags to dictionaries of labelled k-points.
+    get_edges(folder, kpts_soc) has to return the band edges of every SOC
+    flag, so each strained ground state only has to be loaded once.
+    """
     from asr.setup.strains import (get_relevant_strains,
                                    get_strained_folder_name)
     ijlabels = {
@@ -288,33 +334,36 @@ def _main(pbc, kpts, get_edges, strain, soc):
         (0, 2): 'xz',
         (1, 2): 'yz',
     }
-    kptlabels = list(kpts)
-    kpts = list(kpts.values())
+    kptlabels = {soc: list(kpts) for soc, kpts in kpts_soc.items()}
+    kptcoords = {soc: list(kpts.values()) for soc, kpts in kpts_soc.items()}
 
     # Initialize strains and deformation potentials results
     strains = [-abs(strain), abs(strain)]
-    defpots = {kpt: OrderedDict() for kpt in kptlabels}
+    defpots = {soc: {kpt: OrderedDict() for kpt in labels}
+               for soc, labels in kptlabels.items()}
 
     # Navigate the directories containing the ground states of
     # the strained structures and extract the band edges
     for ij in get_relevant_strains(pbc):
         straincomp = ijlabels[ij]
-        edges_ij = []
+        edges_ij = {soc: [] for soc in kpts_soc}
         for strain in strains:
             folder = get_strained_folder_name(strain, ij[0], ij[1])
-            edges = get_edges(folder, kpts, soc)
-            edges_ij.append(edges)
+            edges = get_edges(folder, kptcoords)
+            for soc in kpts_soc:
+                edges_ij[soc].append(edges[soc])
 
         # Actual calculation of the deformation potentials
-        defpots_ij = np.squeeze(
-            np.diff(edges_ij, axis=0) / (np.ptp(strains) * 0.01)
-        )
+        for soc, labels in kptlabels.items():
+            defpots_ij = np.squeeze(
+                np.diff(edges_ij[soc], axis=0) / (np.ptp(strains) * 0.01)
+            )
 
-        for dp, kpt in zip(defpots_ij, kptlabels):
-            defpots[kpt][straincomp] = {
-                'VB': dp[0],
-                'CB': dp[1]
-            }
+            for dp, kpt in zip(defpots_ij, labels):
+                defpots[soc][kpt][straincomp] = {
+                    'VB': dp[0],
+                    'CB': dp[1]
+                }
 
     return defpots
 
@@ -361,11 +410,20 @@ def main(strain: float = 1.0) -> Result:
     soclabels = {'defpots_nosoc': False,
                  'defpots_soc': True}
 
+    # the band edges at the special points are obtained for both SOC flags
+    # from a single calculation on the unstrained material
+    _, coords = get_special_kpts(calc.atoms)
+    special_edges = gpaw_get_all_edges(
+        '.', {soc: coords for soc in soclabels.values()})
+    kpoints = {soc: get_relevant_kpts(calc, '.', soc, special_edges[soc])
+               for soc in soclabels.values()}
+    # both SOC flags are evaluated from the same strained calculations
+    defpots_soc = _main(calc.atoms.pbc, kpoints, gpaw_get_all_edges, strain)
+
     results = {}
     for label, soc in soclabels.items():
-        kpoints = get_relevant_kpts(calc, '.', soc)
-        results[f'kpts_{label}'] = kpoints
-        defpots = _main(calc.atoms.pbc, kpoints, gpaw_get_edges, strain, soc)
+        results[f'kpts_{label}'] = kpoints[soc]
+        defpots = defpots_soc[soc]
         results[label] = defpots
 
         # Updating results with band gap deformation potentials
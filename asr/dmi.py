@@ -1,7 +1,8 @@
 from asr.core import command, option, DictStr, ASRResult, prepare_result
+from functools import lru_cache
 from typing import List
 import numpy as np
-from os import path
+import os
 
 
 def find_ortho_nn(kpts: List[float],
@@ -18,19 +19,18 @@ def find_ortho_nn(kpts: List[float],
         npoints = [npoints] * 3
 
     # Warning, might not find inversion symmetric points if k-points are not symmetric
-    from scipy.spatial import cKDTree
+    kpts = np.asarray(kpts, dtype=float)
 
-    # Calculate distance-ordered indices from the (eps postive) origin
-    _, indices = cKDTree(kpts).query([eps, eps, eps], k=len(kpts))
-    indices = indices[1:]
+    # Calculate distances from the (eps postive) origin, which is itself skipped
+    dist_k = np.linalg.norm(kpts - eps, axis=1)
+    origin = np.argmin(dist_k)
     periodic_directions = np.where(pbc)[0]
 
     orthNN = []
     for direction in periodic_directions:
-        xNN = find_neighbours_in_line(kpts, direction, indices, npoints)
+        xNN = find_neighbours_in_line(kpts, direction, dist_k, origin, npoints)
 
         if len(xNN) > 0:
-            xNN = np.round(np.array(xNN), 16)
             orthNN.append(xNN)
 
     shape = [np.shape(orthNN[j]) for j in range(len(orthNN))]
@@ -50,19 +50,24 @@ def kgrid_to_qgrid(k_qc):
     return q_qc
 
 
-def find_neighbours_in_line(kpts, direction, indices, npoints):
-    orthNN = []
+def find_neighbours_in_line(kpts, direction, dist_k, origin, npoints, tol=1e-8):
+    """Return the npoints[direction] closest k-points on the given axis.
+
+    The k-point with index origin is excluded and ties in dist_k keep the
+    order of kpts.
+    """
+    kpts = np.asarray(kpts)
     orthoDirs = [(direction + 1) % 3, (direction + 2) % 3]
-    i = 0
-    for j, idx in enumerate(indices):
-        # Check if point lies on a line x, y or z
-        if np.isclose(kpts[idx][orthoDirs[0]], 0) and \
-           np.isclose(kpts[idx][orthoDirs[1]], 0):
-            if i >= npoints[direction]:
-                return orthNN
-            orthNN.append(kpts[idx])
-            i += 1
-    return orthNN
+    # Check which points lie on a line x, y or z
+    on_line_k = (np.abs(kpts[:, orthoDirs]) <= tol).all(axis=1)
+    on_line_k[origin] = False
+    line_k = np.flatnonzero(on_line_k)
+    # Only the few points on the line need sorting
+    order = np.argsort(dist_k[line_k], kind='stable')[:npoints[direction]]
+    line_kc = kpts[line_k[order]]
+    # Put the points exactly on the axis
+    line_kc[:, orthoDirs] = 0.0
+    return line_kc
 
 
 @prepare_result
@@ -73,11 +78,34 @@ class PreResult(ASRResult):
                         "en_nq": "energy of respective spin spiral groundstates"}
 
 
+def run_spinspiral(i, j, q_c, calculator, restart=False):
+    """Return the ground state energy of spin spiral j along direction i.
+
+    With restart, the energy is read from an existing gsq{j}d{i}.gpw.
+    """
+    if restart:
+        from gpaw.new.ase_interface import GPAW
+        return GPAW(f'gsq{j}d{i}.gpw').get_potential_energy()
+
+    from copy import deepcopy
+    from asr.spinspiral import spinspiral
+
+    # spinspiral stores the rotated moments in the calculator dict,
+    # so every spiral gets its own copy
+    calculator = deepcopy(calculator)
+    calculator['txt'] = f'gsq{j}d{i}.txt'
+    calculator['mode']['qspiral'] = q_c
+    return spinspiral(calculator)['energy']
+
+
 @command(module='asr.dmi',
          resources='40:1h',
          requires=['structure.json'])
 @option('-c', '--calculator', help='Calculator params.', type=DictStr())
 @option('-n', help='Number of points along orthogonal directions', type=int)
+@option('-j', '--njobs', type=int,
+        help='Number of processes calculating the spin spirals in parallel. '
+        'Only used for serial GPAW runs.')
 def prepare_dmi(calculator: dict = {
         'mode': {'name': 'pw', 'ecut': 800, 'qspiral': [0, 0, 0]},
         'xc': 'LDA',
@@ -89,34 +117,32 @@ def prepare_dmi(calculator: dict = {
                         'width': 0.05},
         'convergence': {'bands': 'CBM+3.0'},
         'txt': 'gsq.txt',
-        'charge': 0}, n: int = 2) -> ASRResult:
+        'charge': 0}, n: int = 2, njobs: int = 1) -> ASRResult:
     from ase.io import read
     from ase.dft.kpoints import monkhorst_pack
     from ase.calculators.calculator import kpts2sizeandoffsets
-    from asr.spinspiral import spinspiral
-    from gpaw.new.ase_interface import GPAW
+    from ase.parallel import world
     atoms = read('structure.json')
 
     size, offsets = kpts2sizeandoffsets(atoms=atoms, **calculator['kpts'])
     kpts_kc = monkhorst_pack(size) + offsets
     kpts_nqc = find_ortho_nn(kpts_kc, atoms.pbc, npoints=n)
-    en_nq = []
-    q_nqc = []
-    for i, k_qc in enumerate(kpts_nqc):
-        en_q = []
-
-        q_qc = kgrid_to_qgrid(k_qc)
-        for j, q_c in enumerate(q_qc):
-            if not path.isfile(f'gsq{j}d{i}.gpw'):
-                calculator['txt'] = f'gsq{j}d{i}.txt'
-                calculator['mode']['qspiral'] = q_c
-                result = spinspiral(calculator)
-                en_q.append(result['energy'])
-            else:
-                result = GPAW(f'gsq{j}d{i}.gpw')
-                en_q.append(result['energy'])
-        en_nq.append(en_q)
-        q_nqc.append(q_qc)
+    q_nqc = [kgrid_to_qgrid(k_qc) for k_qc in kpts_nqc]
+
+    # list the finished ground states once instead of checking every file
+    gpwfiles = {name for name in os.listdir('.') if name.endswith('.gpw')}
+    tasks = [(i, j, q_c, calculator, f'gsq{j}d{i}.gpw' in gpwfiles)
+             for i, q_qc in enumerate(q_nqc) for j, q_c in enumerate(q_qc)]
+    if njobs > 1 and world.size == 1:
+        import multiprocessing
+        with multiprocessing.Pool(njobs) as pool:
+            en_t = pool.starmap(run_spinspiral, tasks)
+    else:
+        en_t = [run_spinspiral(*task) for task in tasks]
+
+    # Split the energies back into the directions
+    split_n = np.cumsum([len(q_qc) for q_qc in q_nqc])[:-1]
+    en_nq = np.split(np.asarray(en_t), split_n)
     return PreResult.fromdata(qpts_nqc=q_nqc, en_nq=en_nq)
 
 
@@ -178,58 +204,88 @@ class Result(ASRResult):
     formats = {"ase_webpanel": webpanel}
 
 
+@lru_cache(maxsize=16)
+def get_occcalc(width):
+    """Return a Fermi-Dirac occupation calculator of the given width."""
+    from gpaw.occupations import create_occ_calc
+    return create_occ_calc({'name': 'fermi-dirac', 'width': width})
+
+
+def get_soc_energies(n, j, width):
+    """Return the SOC band energies of spin spiral j along direction n.
+
+    The energies are given for the spin quantization axes x, y and z
+    relative to the band energies with zero SOC scaling.
+    """
+    from gpaw.new.ase_interface import GPAW
+    from gpaw.spinorbit import soc_eigenstates
+
+    occcalc = get_occcalc(width)
+    calc = f'gsq{j}d{n}.gpw'
+    calc = GPAW(calc)
+    Ex, Ey, Ez = (soc_eigenstates(calc, projected=True, occcalc=occcalc,
+                                  theta=th, phi=phi).calculate_band_energy()
+                  for th, phi in [(90, 0), (90, 90), (0, 0)])
+    # This is required, otherwise result is very noisy
+    E0x, E0y, E0z = (soc_eigenstates(calc, projected=True,
+                                     occcalc=occcalc, scale=0,
+                                     theta=th, phi=phi).calculate_band_energy()
+                     for th, phi in [(90, 0), (90, 90), (0, 0)])
+    return np.array([Ex - E0x, Ey - E0y, Ez - E0z])
+
+
 @command(module='asr.dmi',
          dependencies=['asr.dmi@prepare_dmi'],
          resources='1:1h',
          returns=Result)
-def main() -> Result:
-    from gpaw.new.ase_interface import GPAW
-    from gpaw.spinorbit import soc_eigenstates
-    from gpaw.occupations import create_occ_calc
+@option('-j', '--njobs', type=int,
+        help='Number of processes evaluating the spin spirals in parallel. '
+        'Only used for serial GPAW runs.')
+def main(njobs: int = 1) -> Result:
     from ase.dft.kpoints import kpoint_convert
     from ase.io import read
+    from ase.parallel import world
     from asr.core import read_json
     atoms = read('structure.json')
 
-    qpts_nqc = read_json('results-asr.dmi@prepare_dmi.json')['qpts_nqc']
-    en_nq = read_json('results-asr.dmi@prepare_dmi.json')['en_nq']
+    prepared = read_json('results-asr.dmi@prepare_dmi.json')
+    qpts_nqc = prepared['qpts_nqc']
+    en_nq = prepared['en_nq']
     width = 0.001
-    occcalc = create_occ_calc({'name': 'fermi-dirac', 'width': width})
-
-    E_nq = []
-    q_nqc = []
-    D_nqv = []
-    for n, q_qc in enumerate(qpts_nqc):
-        Esoc_q = []
-        for j, q_c in enumerate(q_qc):
-            calc = f'gsq{j}d{n}.gpw'
-            calc = GPAW(calc)
-            Ex, Ey, Ez = (soc_eigenstates(calc, projected=True, occcalc=occcalc,
-                                          theta=th, phi=phi).calculate_band_energy()
-                          for th, phi in [(90, 0), (90, 90), (0, 0)])
-            # This is required, otherwise result is very noisy
-            E0x, E0y, E0z = (soc_eigenstates(calc, projected=True,
-                                             occcalc=occcalc, scale=0,
-                                             theta=th, phi=phi).calculate_band_energy()
-                             for th, phi in [(90, 0), (90, 90), (0, 0)])
-            Esoc_q.append(np.array([Ex - E0x, Ey - E0y, Ez - E0z]))
-        Esoc_q = np.array(Esoc_q)
-        q_qc = (q_qc[::2] - q_qc[1::2]) / 2
-        E_q = (Esoc_q[::2] - Esoc_q[1::2]) / 2
-
-        # Sign correction
-        sign_correction_q = np.sign(np.sum(q_qc, axis=-1))
-        q_qc = (q_qc.T * sign_correction_q).T
-        E_q = (E_q.T * sign_correction_q).T
-
-        dq_qv = kpoint_convert(cell_cv=atoms.cell, skpts_kc=q_qc)
-        dq_q = np.linalg.norm(dq_qv, axis=-1)
-        D_qv = np.divide(-2 * 1000 * E_q.T, dq_q).T
-
-        # Append to data
-        E_nq.append(E_q)
-        q_nqc.append(q_qc)
-        D_nqv.append(D_qv)
+
+    # The spin spirals are independent, so they can be evaluated by a pool
+    # of processes when GPAW itself does not run in parallel
+    tasks = [(n, j, width) for n, q_qc in enumerate(qpts_nqc)
+             for j in range(len(q_qc))]
+    if njobs > 1 and world.size == 1:
+        import multiprocessing
+        with multiprocessing.Pool(njobs) as pool:
+            Esoc_t = pool.starmap(get_soc_energies, tasks)
+    else:
+        Esoc_t = [get_soc_energies(*task) for task in tasks]
+    Esoc_tv = np.array(Esoc_t).reshape(len(tasks), 3)
+    q_tc = np.array([q_c for q_qc in qpts_nqc for q_c in q_qc],
+                    dtype=float).reshape(len(tasks), 3)
+
+    # Every direction holds an even number of spirals, so the +q/-q pairs
+    # of all directions are differenced together in the flat arrays
+    q_pc = (q_tc[::2] - q_tc[1::2]) / 2
+    E_pv = (Esoc_tv[::2] - Esoc_tv[1::2]) / 2
+
+    # Sign correction
+    sign_correction_p = np.sign(np.sum(q_pc, axis=-1))[:, np.newaxis]
+    q_pc *= sign_correction_p
+    E_pv *= sign_correction_p
+
+    dq_pv = kpoint_convert(cell_cv=atoms.cell, skpts_kc=q_pc)
+    dq_p = np.linalg.norm(dq_pv, axis=-1)
+    D_pv = -2 * 1000 * E_pv / dq_p[:, np.newaxis]
+
+    # Split the pairs back into the directions
+    split_n = np.cumsum([len(q_qc) // 2 for q_qc in qpts_nqc])[:-1]
+    E_nq = np.split(E_pv, split_n)
+    q_nqc = np.split(q_pc, split_n)
+    D_nqv = np.split(D_pv, split_n)
 
     # Sortable key-value pair
     DMI = np.round(np.max(np.linalg.norm(D_nqv[0][0], axis=-1)), 2)
@@ -2,8 +2,6 @@
 from __future__ import annotations
 
 from pathlib import Path
-from typing import List
-
 import numpy as np
 
 from asr.core import ASRResult, command, option, prepare_result
@@ -36,9 +34,9 @@ def webpanel(result: ASRResult,
 
 @prepare_result
 class DOSResult(ASRResult):
-    dosspin0_e: List[float]
-    dosspin1_e: List[float]
-    energies_e: List[float]
+    dosspin0_e: np.ndarray
+    dosspin1_e: np.ndarray
+    energies_e: np.ndarray
     natoms: int
     volume: float
 
@@ -75,29 +73,29 @@ def main(name: str = 'dos.gpw',
     calc = GPAW(path)
     doscalc = calc.dos()
     data = _main(doscalc)
-    data['natoms'] = len(calc.atoms)
-    data['volume'] = calc.atoms.get_volume()
+    atoms = calc.atoms
+    data['natoms'] = len(atoms)
+    data['volume'] = atoms.get_volume()
     return DOSResult(data=data)
 
 
 def _main(doscalc) -> dict:
     energies_e = np.linspace(-10, 10, 201)
-    data = {'energies_e': energies_e.tolist(),
-            'dosspin1_e': []}
+    data = {'energies_e': energies_e,
+            'dosspin1_e': np.zeros(0)}
     for spin in range(doscalc.nspins):
-        dos_e = doscalc.raw_dos(energies_e, spin, width=0)
-        data[f'dosspin{spin}_e'] = dos_e.tolist()
+        data[f'dosspin{spin}_e'] = doscalc.raw_dos(energies_e, spin, width=0)
     return data
 
 
 def dos_plot(row, filename: str):
     import matplotlib.pyplot as plt
     dos = row.data.get('results-asr.dos.json')
-    x = dos['energies_e']
-    y0 = dos['dosspin0_e']
-    y1 = dos.get('dosspin1_e')
+    x = np.asarray(dos['energies_e'])
+    y0 = np.asarray(dos['dosspin0_e'])
+    y1 = np.asarray(dos.get('dosspin1_e', []))
     fig, ax = plt.subplots()
-    if y1:
+    if y1.size:
         ax.plot(x, y0, label='up')
         ax.plot(x, y1, label='down')
         ax.legend()
@@ -1,6 +1,7 @@
 """Effective masses."""
 from asr.core import command, option, DictStr, ASRResult, prepare_result
 from asr.database.browser import make_panel_description, describe_entry
+from functools import lru_cache
 import numpy as np
 
 panel_description = make_panel_description(
@@ -65,9 +66,9 @@ def refine(gpwfilename: str = 'gs.gpw',
     import os.path
     set_default(settings)
     socs = [True]
+    theta, phi = get_spin_axis()
 
     for soc in socs:
-        theta, phi = get_spin_axis()
         calc = GPAW(gpwfilename, txt=None)
         eigenvalues, efermi = calc2eigs(calc=calc, soc=soc,
                                         theta=theta, phi=phi)
@@ -75,6 +76,8 @@ def refine(gpwfilename: str = 'gs.gpw',
                             output=None)
         if not gap > 0:
             raise NoGapError('Gap was zero: {}'.format(gap))
+        k_kc = calc.get_bz_k_points()
+        cell_cv = calc.atoms.get_cell()
 
         for bt in ['vb', 'cb']:
             name = get_name(soc=soc, bt=bt)
@@ -82,32 +85,48 @@ def refine(gpwfilename: str = 'gs.gpw',
 
             if os.path.exists(gpw2):
                 continue
+            # The first refinement reuses the loaded calculator, which
+            # preliminary_refine then moves to its new k-points
             gpwrefined = preliminary_refine(gpw=gpwfilename, soc=soc,
-                                            bandtype=bt, settings=settings)
+                                            bandtype=bt, settings=settings,
+                                            calc=calc, theta=theta, phi=phi,
+                                            k_kc=k_kc, cell_cv=cell_cv,
+                                            eigenvalues=eigenvalues,
+                                            efermi=efermi)
+            calc = None
             nonsc_sphere(gpw=gpwrefined, fallback=gpwfilename, soc=soc,
-                         bandtype=bt, settings=settings)
+                         bandtype=bt, settings=settings,
+                         theta=theta, phi=phi, cell_cv=cell_cv)
 
 
 def get_name(soc, bt):
     return 'em_circle_{}_{}'.format(bt, ['nosoc', 'soc'][soc])
 
 
-def preliminary_refine(gpw='gs.gpw', soc=True, bandtype=None, settings=None):
+def preliminary_refine(gpw='gs.gpw', soc=True, bandtype=None, settings=None,
+                       calc=None, theta=None, phi=None,
+                       k_kc=None, cell_cv=None, eigenvalues=None, efermi=None):
     from gpaw import GPAW
     import numpy as np
     from asr.utils.gpw2eigs import calc2eigs
     from ase.dft.bandgap import bandgap
     from asr.magnetic_anisotropy import get_spin_axis
     # Get calc and current kpts
-    calc = GPAW(gpw, txt=None)
+    if calc is None:
+        calc = GPAW(gpw, txt=None)
     ndim = calc.atoms.pbc.sum()
 
-    k_kc = calc.get_bz_k_points()
-    cell_cv = calc.atoms.get_cell()
+    if k_kc is None:
+        k_kc = calc.get_bz_k_points()
+    if cell_cv is None:
+        cell_cv = calc.atoms.get_cell()
 
     # Find energies and VBM/CBM
-    theta, phi = get_spin_axis()
-    e_skn, efermi = calc2eigs(calc, soc=soc, theta=theta, phi=phi)
+    if eigenvalues is None:
+        if theta is None:
+            theta, phi = get_spin_axis()
+        eigenvalues, efermi = calc2eigs(calc, soc=soc, theta=theta, phi=phi)
+    e_skn = eigenvalues
     if e_skn.ndim == 2:
         e_skn = e_skn[np.newaxis]
     gap, (s1, k1, n1), (s2, k2, n2) = bandgap(eigenvalues=e_skn, efermi=efermi,
@@ -143,14 +162,15 @@ def preliminary_refine(gpw='gs.gpw', soc=True, bandtype=None, settings=None):
     return fname + '.gpw'
 
 
-def get_gapskn(calc, fallback=None, soc=True):
+def get_gapskn(calc, fallback=None, soc=True, theta=None, phi=None):
     import numpy as np
     from ase.dft.bandgap import bandgap
     from asr.magnetic_anisotropy import get_spin_axis
     from asr.utils.gpw2eigs import calc2eigs
     from ase.parallel import parprint
 
-    theta, phi = get_spin_axis()
+    if theta is None:
+        theta, phi = get_spin_axis()
     e_skn, efermi = calc2eigs(calc, soc=soc, theta=theta, phi=phi)
     if e_skn.ndim == 2:
         e_skn = e_skn[np.newaxis, :, :]
@@ -160,7 +180,6 @@ def get_gapskn(calc, fallback=None, soc=True):
 
     if np.allclose(gap, 0) and fallback is not None:
         parprint("Something went wrong. Using fallback gpw.")
-        theta, phi = get_spin_axis()
         e_skn, efermi = calc2eigs(fallback, soc=soc, theta=theta, phi=phi)
         if e_skn.ndim == 2:
             e_skn = e_skn[np.newaxis, :, :]
@@ -174,7 +193,8 @@ def get_gapskn(calc, fallback=None, soc=True):
 
 
 def nonsc_sphere(gpw='gs.gpw', fallback='gs.gpw', soc=False,
-                 bandtype=None, settings=None):
+                 bandtype=None, settings=None, theta=None, phi=None,
+                 cell_cv=None):
     """Non sc calculation for kpts in a sphere around the VBM/CBM.
 
     Writes the files:
@@ -207,14 +227,16 @@ def nonsc_sphere(gpw='gs.gpw', fallback='gs.gpw', soc=False,
         assert pbc[0] and pbc[1] and not pbc[2]
 
     k_kc = calc.get_bz_k_points()
-    cell_cv = calc.atoms.get_cell()
+    if cell_cv is None:
+        cell_cv = calc.atoms.get_cell()
 
     nkpts = settings['nkpts2']
     erange = settings['erange2']
     kcirc_kc = kptsinsphere(cell_cv, dimensionality=ndim,
                             erange=erange, npoints=nkpts)
 
-    gap, (s1, k1, n1), (s2, k2, n2) = get_gapskn(calc, fallback=None, soc=soc)
+    gap, (s1, k1, n1), (s2, k2, n2) = get_gapskn(calc, fallback=None, soc=soc,
+                                                 theta=theta, phi=phi)
 
     k1_c = k_kc[k1]
     k2_c = k_kc[k2]
@@ -232,26 +254,38 @@ def nonsc_sphere(gpw='gs.gpw', fallback='gs.gpw', soc=False,
         calc.write(name + '.gpw')
 
 
-def kptsinsphere(cell_cv, npoints=9, erange=1e-3, m=1.0, dimensionality=3):
-    import numpy as np
-    from ase.units import Hartree, Bohr
-    from ase.dft.kpoints import kpoint_convert
+@lru_cache(maxsize=64)
+def unit_sphere_points(npoints, dimensionality):
+    """Return the points of an npoints grid on [-1, 1] inside the unit sphere.
 
+    The (k, 3) array is read-only since it is shared between calls.
+    """
     a = np.linspace(-1, 1, npoints)
-    X, Y, Z = np.meshgrid(a, a, a)
-
-    na = np.logical_and
+    # Non-periodic axes only keep the grid point at exactly zero
+    all_g = np.arange(npoints)
+    zero_g = np.flatnonzero(a == 0)
     if dimensionality == 2:
-        indices = na(X**2 + Y**2 <= 1.0, Z == 0)
+        y_g, x_g, z_g = all_g, all_g, zero_g
     elif dimensionality == 1:
-        indices = na(Z**2 <= 1.0, na(X == 0, Y == 0))
+        y_g, x_g, z_g = zero_g, zero_g, all_g
     else:
-        indices = X**2 + Y**2 + Z**2 <= 1.0
+        y_g, x_g, z_g = all_g, all_g, all_g
+
+    # Open grid axes in the (y, x, z) order of np.meshgrid(a, a, a)
+    Y, X, Z = np.ix_(a[y_g], a[x_g], a[z_g])
+    j, i, k = np.nonzero(X**2 + Y**2 + Z**2 <= 1.0)
+    points_kv = np.column_stack([a[x_g[i]], a[y_g[j]], a[z_g[k]]])
+    points_kv.flags.writeable = False
+    return points_kv
+
+
+def kptsinsphere(cell_cv, npoints=9, erange=1e-3, m=1.0, dimensionality=3):
+    import numpy as np
+    from ase.units import Hartree, Bohr
+    from ase.dft.kpoints import kpoint_convert
 
-    x, y, z = X[indices], Y[indices], Z[indices]
-    kpts_kv = np.vstack([x, y, z]).T
     kr = np.sqrt(2 * m * erange / Hartree)
-    kpts_kv *= kr
+    kpts_kv = unit_sphere_points(npoints, dimensionality) * kr
     kpts_kv /= Bohr
     kpts_kc = kpoint_convert(cell_cv=cell_cv, ckpts_kv=kpts_kv)
     return kpts_kc
@@ -271,11 +305,7 @@ def get_bt_ks(bandtype, k1_c, k2_c):
 
 
 def convert_key_to_tuple(key):
-    k = key.replace("(", "").replace(")", "")
-    ks = k.split(",")
-    ks = [k.strip() for k in ks]
-    ks = [int(k) for k in ks]
-    return tuple(ks)
+    return tuple(map(int, key.strip('() ').split(',')))
 
 
 def mareformat(mare):
@@ -283,9 +313,8 @@ def mareformat(mare):
 
 
 def maeformat(mae):
-    import numpy as np
-    f10 = np.log(mae) / np.log(10)
-    f10 = round(f10)
+    import math
+    f10 = round(math.log10(mae))
     mae = mae / 10**(f10)
     if mae < 1:
         f10 -= 1
@@ -298,7 +327,7 @@ def maeformat(mae):
 
 
 def get_emass_dict_from_row(row, has_mae=False):
-    import numpy as np
+    import math
     if has_mae:
         results = row.data['results-asr.emasses@validate.json']
     else:
@@ -345,40 +374,39 @@ def get_emass_dict_from_row(row, has_mae=False):
             else:
                 mares = data[marekey] if has_mae else None
 
-            for k in data.keys():
-                if 'effmass' in k:
-                    mass = data[k]
-                    if mass is not None and not np.isnan(mass):
-                        direction += 1
-                        expectedsign = 1 if name == "CB" else -1
-                        if abs(mass) > 3000 or np.sign(mass) != expectedsign:
-                            mass_str = "N/A"
+            masses = [data[k] for k in data if 'effmass' in k]
+            for mass in masses:
+                if mass is not None and not math.isnan(mass):
+                    direction += 1
+                    wrong_sign = mass <= 0 if name == 'CB' else mass >= 0
+                    if abs(mass) > 3000 or wrong_sign:
+                        mass_str = "N/A"
+                    else:
+                        mass_str = str(round(abs(mass) * 100)
+                                       / 100) + " m<sub>0</sub>"
+
+                    if has_mae:
+                        mare = mares[direction - 1]
+                        marestr = mareformat(mare)
+
+                        if offset_num == 0:
+                            my_dict[f'{name}, direction {direction}'] = \
+                                (f'{mass_str}', marestr)
                         else:
-                            mass_str = str(round(abs(mass) * 100)
-                                           / 100) + " m<sub>0</sub>"
-
-                        if has_mae:
-                            mare = mares[direction - 1]
-                            marestr = mareformat(mare)
-
-                            if offset_num == 0:
-                                my_dict[f'{name}, direction {direction}'] = \
-                                    (f'{mass_str}', marestr)
-                            else:
-                                my_dict['{} {} {}, direction {}'.format(
-                                    name, offset_sym,
-                                    offset_num, direction)] = \
-                                    (f'{mass_str}', marestr)
-
+                            my_dict['{} {} {}, direction {}'.format(
+                                name, offset_sym,
+                                offset_num, direction)] = \
+                                (f'{mass_str}', marestr)
+
+                    else:
+                        if offset_num == 0:
+                            my_dict[f'{name}, direction {direction}'] = \
+                                f'{mass_str}'
                         else:
-                            if offset_num == 0:
-                                my_dict[f'{name}, direction {direction}'] = \
-                                    f'{mass_str}'
-                            else:
-                                my_dict['{} {} {}, direction {}'.format(
-                                    name, offset_sym,
-                                    offset_num, direction)] = \
-                                    f'{mass_str}'
+                            my_dict['{} {} {}, direction {}'.format(
+                                name, offset_sym,
+                                offset_num, direction)] = \
+                                f'{mass_str}'
 
         return my_dict
 
@@ -409,10 +437,10 @@ def plot_band(fig, axes, mass, reference, cell_cv,
               adjust_view=True, spin_degenerate=False):
     import matplotlib.pyplot as plt
     shape = e_km.shape
-    perm = (-sz_km).argsort(axis=None)
-    repeated_xcoords = np.vstack([xk2] * shape[1]).T
+    perm = np.argsort(sz_km, axis=None)[::-1]
     flat_energies = e_km.ravel()[perm]
-    flat_xcoords = repeated_xcoords.ravel()[perm]
+    # Row k of the flattened (k, m) arrays belongs to xk2[k]
+    flat_xcoords = np.asarray(xk2)[perm // shape[1]]
 
     if spin_degenerate:
         colors = np.zeros_like(flat_energies)
@@ -486,43 +514,7 @@ def make_the_plots(row, *args):
     cb_fnames = []
     vb_fnames = []
 
-    vb_indices = []
-    cb_indices = []
-
-    for spin_band_str, data in results.items():
-        if '__' in spin_band_str or not isinstance(data, dict):
-            continue
-        is_w_soc = check_soc(data)
-        if not is_w_soc:
-            continue
-        for k in data.keys():
-            if 'effmass' in k and 'vb' in k:
-                vb_indices.append(spin_band_str)
-                break
-            if 'effmass' in k and 'cb' in k:
-                cb_indices.append(spin_band_str)
-                break
-
-    cb_masses = {}
-    vb_masses = {}
-
-    for cb_key in cb_indices:
-        data = results[cb_key]
-        masses = []
-        for k in data.keys():
-            if 'effmass' in k:
-                masses.append(data[k])
-        tuple_key = convert_key_to_tuple(cb_key)
-        cb_masses[tuple_key] = masses
-
-    for vb_key in vb_indices:
-        data = results[vb_key]
-        masses = []
-        for k in data.keys():
-            if 'effmass' in k:
-                masses.append(data[k])
-        tuple_key = convert_key_to_tuple(vb_key)
-        vb_masses[tuple_key] = masses
+    cb_indices, vb_indices, masses = get_soc_band_entries(results)
 
     plt_count = 0
     for direction in range(3):
@@ -542,7 +534,7 @@ def make_the_plots(row, *args):
                 should_plot = False
                 continue
 
-            mass = cb_masses[cb_tuple][direction]
+            mass = masses[cb_tuple][direction]
             fit_data = fit_data_list[direction]
 
             if i == 0:
@@ -580,7 +572,7 @@ def make_the_plots(row, *args):
             if direction >= len(fit_data_list):
                 continue
 
-            mass = vb_masses[vb_tuple][direction]
+            mass = masses[vb_tuple][direction]
             fit_data = fit_data_list[direction]
 
             if i == 0:
@@ -677,43 +669,7 @@ def create_columns_fnames(row):
     cb_fnames = []
     vb_fnames = []
 
-    vb_indices = []
-    cb_indices = []
-
-    for spin_band_str, data in results.items():
-        if '__' in spin_band_str or not isinstance(data, dict):
-            continue
-        is_w_soc = check_soc(data)
-        if not is_w_soc:
-            continue
-        for k in data.keys():
-            if 'effmass' in k and 'vb' in k:
-                vb_indices.append(spin_band_str)
-                break
-            if 'effmass' in k and 'cb' in k:
-                cb_indices.append(spin_band_str)
-                break
-
-    cb_masses = {}
-    vb_masses = {}
-
-    for cb_key in cb_indices:
-        data = results[cb_key]
-        masses = []
-        for k in data.keys():
-            if 'effmass' in k:
-                masses.append(data[k])
-        tuple_key = convert_key_to_tuple(cb_key)
-        cb_masses[tuple_key] = masses
-
-    for vb_key in vb_indices:
-        data = results[vb_key]
-        masses = []
-        for k in data.keys():
-            if 'effmass' in k:
-                masses.append(data[k])
-        tuple_key = convert_key_to_tuple(vb_key)
-        vb_masses[tuple_key] = masses
+    cb_indices, vb_indices, _ = get_soc_band_entries(results)
 
     for direction in range(3):
         should_plot = True
@@ -747,12 +703,45 @@ def create_columns_fnames(row):
     return columns, cb_fnames + vb_fnames
 
 
-def check_soc(spin_band_dict):
-    for k in spin_band_dict.keys():
-        if 'effmass' in k and 'nosoc' in k:
-            return False
+def classify_entry(spin_band_dict):
+    """Return the band type and effective masses of a spin-band entry.
 
-    return True
+    The keys are scanned once. The band type is None for entries
+    without SOC effective masses.
+    """
+    bandtype = None
+    masses = []
+    for k, value in spin_band_dict.items():
+        if 'effmass' not in k:
+            continue
+        if 'nosoc' in k:
+            return None, []
+        if bandtype is None:
+            if 'vb' in k:
+                bandtype = 'vb'
+            elif 'cb' in k:
+                bandtype = 'cb'
+        masses.append(value)
+    return bandtype, masses
+
+
+def get_soc_band_entries(results):
+    """Return the CB and VB keys with SOC masses and the masses by index."""
+    cb_indices = []
+    vb_indices = []
+    masses = {}
+    for spin_band_str, data in results.items():
+        if '__' in spin_band_str or not isinstance(data, dict):
+            continue
+        bandtype, masses_d = classify_entry(data)
+        if bandtype is None:
+            continue
+        if bandtype == 'vb':
+            vb_indices.append(spin_band_str)
+        else:
+            cb_indices.append(spin_band_str)
+        masses[convert_key_to_tuple(spin_band_str)] = masses_d
+    return cb_indices, vb_indices, masses
 
 
 class Result(ASRResult):
@@ -779,8 +768,8 @@ def main(gpwfilename: str = 'gs.gpw') -> ASRResult:
     socs = [True]
 
     good_results = {}
+    theta, phi = get_spin_axis()
     for soc in socs:
-        theta, phi = get_spin_axis()
         eigenvalues, efermi = gpw2eigs(gpw=gpwfilename, soc=soc,
                                        theta=theta, phi=phi)
         gap, _, _ = bandgap(eigenvalues=eigenvalues, efermi=efermi,
@@ -793,7 +782,8 @@ def main(gpwfilename: str = 'gs.gpw') -> ASRResult:
             try:
                 masses = embands(gpw2,
                                  soc=soc,
-                                 bandtype=bt)
+                                 bandtype=bt,
+                                 theta=theta, phi=phi)
 
                 # This function modifies the last argument
                 unpack_masses(masses, soc, bt, good_results)
@@ -824,44 +814,42 @@ def unpack_masses(masses, soc, bt, results_dict):
         prefix = bt + '_' + socpre + '_'
         offset = out_dict['offset']
 
-        results_dict[index] = {}
-
         mass_u = list(out_dict['mass_u'])
 
         for u, m in enumerate(mass_u):
             if np.isnan(m):
                 mass_u[u] = None
 
-        results_dict[index][prefix + 'effmass_dir1'] = mass_u[0]
-        results_dict[index][prefix + 'effmass_dir2'] = mass_u[1]
-        results_dict[index][prefix + 'effmass_dir3'] = mass_u[2]
+        vecs = out_dict['eigenvectors_vu']
+        results_dict[index] = {
+            prefix + 'effmass_dir1': mass_u[0],
+            prefix + 'effmass_dir2': mass_u[1],
+            prefix + 'effmass_dir3': mass_u[2],
+            prefix + 'eigenvectors_vdir1': vecs[:, 0],
+            prefix + 'eigenvectors_vdir2': vecs[:, 1],
+            prefix + 'eigenvectors_vdir3': vecs[:, 2],
+            prefix + 'spin': ind[0],
+            prefix + 'bandindex': ind[1],
+            prefix + 'kpt_v': out_dict['ke_v'],
+            prefix + 'fitcoeff': out_dict['c'],
+            prefix + '2ndOrderFit': out_dict['c2'],
+            prefix + 'mass_u': mass_u,
+            prefix + 'bzcuts': out_dict['bs_along_emasses'],
+            prefix + 'fitkpts_kv': out_dict['fitkpts_kv'],
+            prefix + 'fite_k': out_dict['fite_k'],
+            prefix + '2ndOrderr2': out_dict['r2'],
+            prefix + '3rdOrderr2': out_dict['r'],
+            prefix + '2ndOrderMAE': out_dict['mae2'],
+            prefix + '3rdOrderMAE': out_dict['mae3'],
+            prefix + 'wideareaMAE': out_dict['wideareaMAE']}
 
         if offset == 0:
-            results_dict[f'emass_{bt}_dir1'] = mass_u[0]
-            results_dict[f'emass_{bt}_dir2'] = mass_u[1]
-            results_dict[f'emass_{bt}_dir3'] = mass_u[2]
+            results_dict.update({f'emass_{bt}_dir1': mass_u[0],
+                                 f'emass_{bt}_dir2': mass_u[1],
+                                 f'emass_{bt}_dir3': mass_u[2]})
 
-        vecs = out_dict['eigenvectors_vu']
-        results_dict[index][prefix + 'eigenvectors_vdir1'] = vecs[:, 0]
-        results_dict[index][prefix + 'eigenvectors_vdir2'] = vecs[:, 1]
-        results_dict[index][prefix + 'eigenvectors_vdir3'] = vecs[:, 2]
-        results_dict[index][prefix + 'spin'] = ind[0]
-        results_dict[index][prefix + 'bandindex'] = ind[1]
-        results_dict[index][prefix + 'kpt_v'] = out_dict['ke_v']
-        results_dict[index][prefix + 'fitcoeff'] = out_dict['c']
-        results_dict[index][prefix + '2ndOrderFit'] = out_dict['c2']
-        results_dict[index][prefix + 'mass_u'] = mass_u
-        results_dict[index][prefix + 'bzcuts'] = out_dict['bs_along_emasses']
-        results_dict[index][prefix + 'fitkpts_kv'] = out_dict['fitkpts_kv']
-        results_dict[index][prefix + 'fite_k'] = out_dict['fite_k']
-        results_dict[index][prefix + '2ndOrderr2'] = out_dict['r2']
-        results_dict[index][prefix + '3rdOrderr2'] = out_dict['r']
-        results_dict[index][prefix + '2ndOrderMAE'] = out_dict['mae2']
-        results_dict[index][prefix + '3rdOrderMAE'] = out_dict['mae3']
-        results_dict[index][prefix + 'wideareaMAE'] = out_dict['wideareaMAE']
-
-
-def embands(gpw, soc, bandtype, delta=0.1):
+
+def embands(gpw, soc, bandtype, delta=0.1, theta=None, phi=None):
     """Effective masses for bands within delta of extrema.
 
     Parameters
@@ -880,7 +868,7 @@ def embands(gpw, soc, bandtype, delta=0.1):
 
     """
     from gpaw import GPAW
-    from asr.utils.gpw2eigs import gpw2eigs
+    from asr.utils.gpw2eigs import calc2eigs
     import numpy as np
     from ase.dft.kpoints import kpoint_convert
     from ase.units import Bohr, Hartree
@@ -888,8 +876,9 @@ def embands(gpw, soc, bandtype, delta=0.1):
     calc = GPAW(gpw, txt=None)
     ndim = calc.atoms.pbc.sum()
 
-    theta, phi = get_spin_axis()
-    e_skn, efermi = gpw2eigs(gpw, soc=soc, theta=theta, phi=phi)
+    if theta is None:
+        theta, phi = get_spin_axis()
+    e_skn, efermi = calc2eigs(calc, soc=soc, theta=theta, phi=phi)
     if e_skn.ndim == 2:
         e_skn = e_skn[np.newaxis]
 
@@ -916,7 +905,8 @@ def embands(gpw, soc, bandtype, delta=0.1):
                                                 soc, bandtype, calc,
                                                 spin=b[0],
                                                 band=b[1],
-                                                nbands=nbands)
+                                                nbands=nbands,
+                                                theta=theta, phi=phi)
         masses[b]['wideareaMAE'] = wideMAE(masses[b], bandtype,
                                            cell_cv)
         masses[b]['offset'] = offset
@@ -928,7 +918,7 @@ def calculate_bs_along_emass_vecs(masses_dict, soc,
                                   bt, calc,
                                   spin, band,
                                   erange=250e-3, npoints=91,
-                                  nbands=1):
+                                  nbands=1, theta=None, phi=None):
     from pathlib import Path
     from ase.units import Hartree, Bohr
     from ase.dft.kpoints import kpoint_convert
@@ -938,7 +928,14 @@ def calculate_bs_along_emass_vecs(masses_dict, soc,
     from gpaw import GPAW
     from gpaw.mpi import serial_comm
     import numpy as np
-    cell_cv = calc.get_atoms().get_cell()
+    atoms = calc.get_atoms()
+    cell_cv = atoms.get_cell()
+    nonperiodic_c = ~atoms.pbc
+    line_k = np.linspace(-1, 1, npoints)
+    _max = np.sqrt(2 * MAXMASS * erange / Hartree)
+    if theta is None:
+        theta, phi = get_spin_axis()
+    spin_index = get_spin_index()
 
     results_dicts = []
     for u, mass in enumerate(masses_dict['mass_u']):
@@ -950,23 +947,20 @@ def calculate_bs_along_emass_vecs(masses_dict, soc,
         if not Path(name).is_file():
             with file_barrier([name]):
                 kmax = np.sqrt(2 * abs(mass) * erange / Hartree)
-                _max = np.sqrt(2 * MAXMASS * erange / Hartree)
                 if kmax > _max:
                     kmax = _max
                 assert not np.isnan(kmax)
                 kd_v = masses_dict['eigenvectors_vu'][:, u]
                 assert not (np.isnan(kd_v)).any()
-                k_kv = (np.linspace(-1, 1, npoints) * kmax * kd_v.reshape(3, 1)).T
+                k_kv = (line_k * kmax * kd_v.reshape(3, 1)).T
                 k_kv += masses_dict['ke_v']
                 k_kv /= Bohr
                 assert not (np.isnan(k_kv)).any()
                 k_kc = kpoint_convert(cell_cv=cell_cv, ckpts_kv=k_kv)
                 assert not (np.isnan(k_kc)).any()
-                atoms = calc.get_atoms()
-                for i, pb in enumerate(atoms.pbc):
-                    if not pb:
-                        k_kc[:, i] = 0
+                k_kc[:, nonperiodic_c] = 0
                 assert not (np.isnan(k_kc)).any()
+                atoms = calc.get_atoms()
                 calc.set(kpts=k_kc, symmetry='off',
                          txt=f'{identity}.txt', fixdensity=True)
                 atoms.get_potential_energy()
@@ -974,11 +968,10 @@ def calculate_bs_along_emass_vecs(masses_dict, soc,
 
         calc_serial = GPAW(name, txt=None, communicator=serial_comm)
         k_kc = calc_serial.get_bz_k_points()
-        theta, phi = get_spin_axis()
         e_km, _, s_kvm = calc2eigs(calc_serial, soc=soc, return_spin=True,
                                    theta=theta, phi=phi)
 
-        sz_km = s_kvm[:, get_spin_index(), :]
+        sz_km = s_kvm[:, spin_index, :]
 
         dct = dict(bt=bt,
                    kpts_kc=k_kc,
@@ -1057,7 +1050,10 @@ def em(kpts_kv, eps_k, bandtype=None, ndim=3):
     """
     import numpy as np
     from ase.parallel import parprint
-    c, r, rank, s, = fit(kpts_kv, eps_k, thirdorder=False)
+    # The second order model is the first 10 columns of the third order one
+    A_kp = model(kpts_kv, thirdorder=True)
+    A2_kp = A_kp[:, :10]
+    c, r, rank, s, = fit(kpts_kv, eps_k, thirdorder=False, A_kp=A2_kp)
     assert (r < 1e-3).all()
     dxx = 2 * c[0]
     dyy = 2 * c[1]
@@ -1066,21 +1062,27 @@ def em(kpts_kv, eps_k, bandtype=None, ndim=3):
     dxz = c[4]
     dyz = c[5]
 
-    mae2 = np.mean(np.abs(eps_k - evalmodel(kpts_kv, c, thirdorder=False)))
+    mae2 = np.mean(np.abs(eps_k - np.dot(A2_kp, c)))
 
     xm, ym, zm = get_2nd_order_extremum(c, ndim=ndim)
     ke2_v = np.array([xm, ym, zm])
 
-    c3, r3, rank3, s3 = fit(kpts_kv, eps_k, thirdorder=True)
+    c3, r3, rank3, s3 = fit(kpts_kv, eps_k, thirdorder=True, A_kp=A_kp)
 
-    mae3 = np.mean(np.abs(eps_k - evalmodel(kpts_kv, c3, thirdorder=True)))
+    mae3 = np.mean(np.abs(eps_k - np.dot(A_kp, c3)))
 
     f3xx, f3yy, f3zz, f3xy = c3[:4]
     f3xz, f3yz, f3x, f3y = c3[4:8]
     f3z, f30, f3xxx, f3yyy = c3[8:12]
     f3zzz, f3xxy, f3xxz, f3yyx, f3yyz, f3zzx, f3zzy, f3xyz = c3[12:]
 
-    extremum_type = get_extremum_type(dxx, dyy, dzz, dxy, dxz, dyz, ndim=ndim)
+    hessian = np.array([[dxx, dxy, dxz],
+                        [dxy, dyy, dyz],
+                        [dxz, dyz, dzz]])
+    v2_n, vecs = np.linalg.eigh(hessian)
+
+    extremum_type = get_extremum_type(dxx, dyy, dzz, dxy, dxz, dyz, ndim=ndim,
+                                      vals=v2_n)
     if extremum_type == 'saddlepoint':
         parprint(f'Found a saddlepoint for bandtype {bandtype}')
     xm, ym, zm = get_3rd_order_extremum(xm, ym, zm, c3,
@@ -1103,10 +1105,6 @@ def em(kpts_kv, eps_k, bandtype=None, ndim=3):
     v3_n, w3_vn = np.linalg.eigh(hessian3)
     assert not (np.isnan(w3_vn)).any()
 
-    hessian = np.array([[dxx, dxy, dxz],
-                        [dxy, dyy, dyz],
-                        [dxz, dyz, dzz]])
-    v2_n, vecs = np.linalg.eigh(hessian)
     mass2_u = np.zeros_like(v2_n)
     npis = np.isclose
 
@@ -1139,16 +1137,18 @@ def em(kpts_kv, eps_k, bandtype=None, ndim=3):
     return out
 
 
-def get_extremum_type(dxx, dyy, dzz, dxy, dxz, dyz, ndim=3):
+def get_extremum_type(dxx, dyy, dzz, dxy, dxz, dyz, ndim=3, vals=None):
     # Input: 2nd order derivatives at the extremum point
+    # vals: eigenvalues of the 3D hessian, if the caller already has them
     import numpy as np
     if ndim == 3:
         hessian = np.array([[dxx, dxy, dxz],
                             [dxy, dyy, dyz],
                             [dxz, dyz, dzz]])
-        vals, vecs = np.linalg.eigh(hessian)
-        saddlepoint = not (np.sign(vals[0]) == np.sign(vals[1])
-                           and np.sign(vals[0]) == np.sign(vals[2]))
+        if vals is None:
+            vals = np.linalg.eigh(hessian)[0]
+        sign_n = np.sign(vals)
+        saddlepoint = sign_n.min() != sign_n.max()
 
         if saddlepoint:
             etype = 'saddlepoint'
@@ -1281,48 +1281,48 @@ def get_3rd_order_extremum(xm, ym, zm, c, extremum_type, ndim=3):
         return x, y, z
 
 
-def fit(kpts_kv, eps_k, thirdorder=False):
+def fit(kpts_kv, eps_k, thirdorder=False, A_kp=None):
     import numpy.linalg as la
-    A_kp = model(kpts_kv)
-    if not thirdorder:
-        A_kp = A_kp[:, :10]
+    if A_kp is None:
+        A_kp = model(kpts_kv, thirdorder=thirdorder)
     return la.lstsq(A_kp, eps_k, rcond=-1)
 
 
-def model(kpts_kv):
+def model(kpts_kv, thirdorder=True):
     """Calculate simple third order model.
 
     Parameters
     ----------
         kpts_kv: (nk, 3)-shape ndarray
             units of (1 / Bohr)
+        thirdorder: bool
+            if False only the first 10 (second order) columns are made
 
     """
     import numpy as np
     k_kx, k_ky, k_kz = kpts_kv[:, 0], kpts_kv[:, 1], kpts_kv[:, 2]
 
-    ones = np.ones(len(k_kx))
-
-    A_dp = np.array([k_kx**2,
-                     k_ky**2,
-                     k_kz**2,
-                     k_kx * k_ky,
-                     k_kx * k_kz,
-                     k_ky * k_kz,
-                     k_kx,
-                     k_ky,
-                     k_kz,
-                     ones,
-                     k_kx**3,
-                     k_ky**3,
-                     k_kz**3,
-                     k_kx**2 * k_ky,
-                     k_kx**2 * k_kz,
-                     k_ky**2 * k_kx,
-                     k_ky**2 * k_kz,
-                     k_kz**2 * k_kx,
-                     k_kz**2 * k_ky,
-                     k_kx * k_ky * k_kz]).T
+    A_dp = np.empty((len(kpts_kv), 20 if thirdorder else 10))
+    np.multiply(k_kx, k_kx, out=A_dp[:, 0])
+    np.multiply(k_ky, k_ky, out=A_dp[:, 1])
+    np.multiply(k_kz, k_kz, out=A_dp[:, 2])
+    np.multiply(k_kx, k_ky, out=A_dp[:, 3])
+    np.multiply(k_kx, k_kz, out=A_dp[:, 4])
+    np.multiply(k_ky, k_kz, out=A_dp[:, 5])
+    A_dp[:, 6:9] = kpts_kv
+    A_dp[:, 9] = 1.0
+    if thirdorder:
+        np.power(k_kx, 3, out=A_dp[:, 10])
+        np.power(k_ky, 3, out=A_dp[:, 11])
+        np.power(k_kz, 3, out=A_dp[:, 12])
+        # Reuse the squares and the kx * ky product from above
+        np.multiply(A_dp[:, 0], k_ky, out=A_dp[:, 13])
+        np.multiply(A_dp[:, 0], k_kz, out=A_dp[:, 14])
+        np.multiply(A_dp[:, 1], k_kx, out=A_dp[:, 15])
+        np.multiply(A_dp[:, 1], k_kz, out=A_dp[:, 16])
+        np.multiply(A_dp[:, 2], k_kx, out=A_dp[:, 17])
+        np.multiply(A_dp[:, 2], k_ky, out=A_dp[:, 18])
+        np.multiply(A_dp[:, 3], k_kz, out=A_dp[:, 19])
 
     return A_dp
 
@@ -1332,9 +1332,7 @@ def evalmodel(kpts_kv, c_p, thirdorder=True):
     kpts_kv = np.asarray(kpts_kv)
     if kpts_kv.ndim == 1:
         kpts_kv = kpts_kv[np.newaxis]
-    A_kp = model(kpts_kv)
-    if not thirdorder:
-        A_kp = A_kp[:, :10]
+    A_kp = model(kpts_kv, thirdorder=thirdorder)
     return np.dot(A_kp, c_p)
 
 
@@ -1394,30 +1392,11 @@ def iterateresults(results):
             yield k, newdct
 
 
-def evalmae(cell_cv, k_kc, e_k, bt, c, erange=25e-3):
-    from ase.dft.kpoints import kpoint_convert
-    from ase.units import Ha, Bohr
-    import numpy as np
-
-    erange = erange / Ha
-
-    k_kv = kpoint_convert(cell_cv=cell_cv, skpts_kc=k_kc)
-    e_k = e_k.copy() / Ha
+def evalmae_mare(cell_cv, k_kc, e_k, bt, c, erange=25e-3):
+    """Return the MAE [eV] and MARE [%] of the fit c within erange of the edge.
 
-    if bt == 'vb':
-        k_inds = np.where(np.abs(e_k - np.max(e_k)) < erange)[0]
-        sk_kv = k_kv[k_inds, :] * Bohr
-    else:
-        k_inds = np.where(np.abs(e_k - np.min(e_k)) < erange)[0]
-        sk_kv = k_kv[k_inds, :] * Bohr
-
-    emodel_k = evalmodel(sk_kv, c, thirdorder=True)
-    mae = np.mean(np.abs(emodel_k - e_k[k_inds])) * Ha
-
-    return mae
-
-
-def evalmare(cell_cv, k_kc, e_k, bt, c, erange=25e-3):
+    The k-points are converted and the model evaluated only once for both.
+    """
     from ase.dft.kpoints import kpoint_convert
     from ase.units import Ha, Bohr
     import numpy as np
@@ -1425,19 +1404,20 @@ def evalmare(cell_cv, k_kc, e_k, bt, c, erange=25e-3):
     erange = erange / Ha
 
     k_kv = kpoint_convert(cell_cv=cell_cv, skpts_kc=k_kc)
-    e_k = e_k.copy() / Ha
+    e_k = e_k / Ha
 
     if bt == 'vb':
         k_inds = np.where(np.abs(e_k - np.max(e_k)) < erange)[0]
-        sk_kv = k_kv[k_inds, :] * Bohr
     else:
         k_inds = np.where(np.abs(e_k - np.min(e_k)) < erange)[0]
-        sk_kv = k_kv[k_inds, :] * Bohr
+    sk_kv = k_kv[k_inds, :] * Bohr
 
     emodel_k = evalmodel(sk_kv, c, thirdorder=True)
-    mare = np.mean(np.abs((emodel_k - e_k[k_inds]) / emodel_k)) * 100
+    error_k = emodel_k - e_k[k_inds]
+    mae = np.mean(np.abs(error_k)) * Ha
+    mare = np.mean(np.abs(error_k / emodel_k)) * 100
 
-    return mare
+    return mae, mare
 
 
 def evalparamare(fitinfo, bt, cell, k_kc, e_k):
@@ -1487,6 +1467,7 @@ def validate() -> ValidateResult:
     results = read_json('results-asr.emasses.json')
     myresults = results.copy()
     atoms = read('structure.json')
+    cell_cv = atoms.get_cell()
 
     for (sindex, kindex), data in iterateresults(results):
         # Get info on fit at this point in bandstructure
@@ -1500,12 +1481,11 @@ def validate() -> ValidateResult:
         for i, cutdata in enumerate(data['bzcuts']):
             k_kc = cutdata['kpts_kc']
             e_k = cutdata['e_k']
-            mae = evalmae(atoms.get_cell(), k_kc, e_k, bt, fitinfo)
+            mae, mare = evalmae_mare(cell_cv, k_kc, e_k, bt, fitinfo)
             maes.append(mae)
-            mare = evalmare(atoms.get_cell(), k_kc, e_k, bt, fitinfo)
             mares.append(mare)
 
-            paramare = evalparamare(fitinfo2, bt, atoms.get_cell(), k_kc, e_k)
+            paramare = evalparamare(fitinfo2, bt, cell_cv, k_kc, e_k)
             paramares.append(paramare)
 
         prefix = data['info'] + '_'
@@ -1513,9 +1493,6 @@ def validate() -> ValidateResult:
         myresults[f'({sindex}, {kindex})'][prefix + 'wideareaMARE'] = mares
         myresults[f'({sindex}, {kindex})'][prefix + 'wideareaPARAMARE'] = paramares
 
-        prefix = data['info'] + '_'
-        myresults[f'({sindex}, {kindex})'][prefix + 'wideareaMAE'] = maes
-
     return ValidateResult(results, strict=False)
 
 
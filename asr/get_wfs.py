@@ -1,5 +1,6 @@
 import typing
 import click
+import numpy as np
 from pathlib import Path
 from asr.core import command, option, ASRResult, prepare_result
 
@@ -257,13 +258,10 @@ def return_gapstates(calc_def):
 
 def get_above_below(evs, ef, vbm, cbm):
     """Check whether there are states above/below EF in the gap."""
-    above = False
-    below = False
-    for ev in evs:
-        is_inside_gap = vbm < ev < cbm
-        if is_inside_gap:
-            above |= ev > ef
-            below |= ev < ef
+    evs = np.asarray(evs)
+    gapstates = evs[(vbm < evs) & (evs < cbm)]
+    above = bool((gapstates > ef).any())
+    below = bool((gapstates < ef).any())
 
     return (above, below)
 
@@ -13,7 +13,10 @@ from asr.defect_symmetry import (DefectInfo,
                                  get_spg_symmetry,
                                  get_mapped_structure,
                                  indexlist_cut_atoms,
+                                 get_mapping_images,
+                                 get_tiled_positions,
                                  WFCubeFile,
+                                 DegeneracyCounter,
                                  check_and_return_input)
 
 
@@ -44,6 +47,36 @@ def test_get_supercell_shape(asr_tmpdir):
             assert N == min(i, j)
 
 
+@pytest.mark.parametrize('P', [[[4, 0, 0], [0, 4, 0], [0, 0, 1]],
+                               [[3, 1, 0], [-1, 3, 0], [0, 0, 1]],
+                               [[4, 2, 0], [0, 3, 0], [0, 0, 1]]])
+@pytest.mark.ci
+def test_get_tiled_positions_cover_cell(P):
+    from ase.build import make_supercell
+    primitive = BN.copy()
+    structure = make_supercell(primitive, P)
+    N = get_supercell_shape(primitive, structure)
+    cell = primitive.repeat((N, N, 1)).get_cell()
+    scell = structure.get_cell()
+    shift = [-1.3, 0.7, 0]
+
+    def window(positions):
+        spos = cell.scaled_positions(positions)
+        inside = (abs(spos[:, :2]) <= 1).all(axis=1)
+        return np.round(positions[inside], 8)
+
+    images = get_mapping_images(structure, scell, cell, shift)
+    pos_ac = window(get_tiled_positions(structure, scell, images) + shift)
+
+    # brute force tiling with plenty of images in both in-plane directions
+    allimages = np.array([[i, j, 0]
+                          for i in range(-8, 9) for j in range(-8, 9)])
+    ref_ac = window(get_tiled_positions(structure, scell, allimages) + shift)
+
+    assert len(pos_ac) == len(ref_ac)
+    assert (np.unique(pos_ac, axis=0) == np.unique(ref_ac, axis=0)).all()
+
+
 @pytest.mark.parametrize('tokens',
                          ['v_N.Se_B.1-2',
                           'v_N.v_B.v_X.0-3-4',
@@ -184,6 +217,16 @@ def test_WFCubeFile(band, spin):
         assert wfcubefile.band == band
 
 
+@pytest.mark.ci
+def test_degeneracy_counter():
+    counter = DegeneracyCounter(levelflag=True)
+    offsets = [counter.step(deg) for deg in [1, 2, 2, 1, 2, 2, 2]]
+    assert offsets == [0, 0, 1, 1, 0, 1, 0]
+
+    counter = DegeneracyCounter(levelflag=False)
+    assert [counter.step(1) for _ in range(3)] == [1, 1, 1]
+
+
 @pytest.mark.ci
 def test_check_and_return_input(asr_tmpdir):
 
@@ -0,0 +1,67 @@
+import os
+import numpy as np
+import pytest
+from pathlib import Path
+from asr.core import chdir
+from asr.defectformation import (clear_find_cache, compute_transitions,
+                                 find_file_in_folder, intersections, line)
+
+
+@pytest.mark.ci
+def test_find_file_in_folder_per_cwd(tmp_path):
+    clear_find_cache()
+    for name in ['a', 'b']:
+        (tmp_path / name / 'pristine_sc').mkdir(parents=True)
+        (tmp_path / name / 'pristine_sc' / 'gs.gpw').write_text('')
+
+    paths = []
+    for name in ['a', 'b', 'a']:
+        with chdir(tmp_path / name):
+            paths.append(find_file_in_folder('gs.gpw', 'pristine_sc'))
+    clear_find_cache()
+
+    assert Path(paths[0]) == tmp_path / 'a' / 'pristine_sc' / 'gs.gpw'
+    assert Path(paths[1]) == tmp_path / 'b' / 'pristine_sc' / 'gs.gpw'
+    assert paths[2] == paths[0]
+
+
+@pytest.mark.ci
+def test_find_file_in_folder_skips_symlinks(tmp_path):
+    clear_find_cache()
+    (tmp_path / 'a' / 'pristine_sc').mkdir(parents=True)
+    (tmp_path / 'a' / 'pristine_sc' / 'gs.gpw').write_text('')
+    # a link back up the tree and a linked copy of the folder
+    os.symlink('../a', tmp_path / 'a' / 'loop')
+    os.symlink('a', tmp_path / 'b')
+
+    with chdir(tmp_path):
+        path = find_file_in_folder('gs.gpw', 'pristine_sc')
+    clear_find_cache()
+
+    assert Path(path) == tmp_path / 'a' / 'pristine_sc' / 'gs.gpw'
+
+
+@pytest.mark.ci
+def test_intersections():
+    # y = x, y = 2 - x and the parallel line y = x + 1
+    L1 = line([0, 0], [1, 1])
+    lines = np.array([line([0, 2], [2, 0]), line([0, 1], [1, 2])])
+    points = intersections(L1, lines)
+
+    assert points[0] == pytest.approx([1, 1])
+    assert np.isnan(points[1]).all()
+
+
+@pytest.mark.ci
+def test_compute_transitions():
+    # E(+1) = 0.5 + E_F, E(0) = 1.5 and E(-1) = 3 - E_F in a gap of 2 eV
+    defect_dict = {'fermi_energies': [0, 0, 0],
+                   'formation_energies': [3.0, 1.5, 0.5],
+                   'chargestates': [-1, 0, 1]}
+    trans_xy, trans_q = compute_transitions(defect_dict, 2.0)
+
+    assert trans_xy.dtype == float
+    assert trans_q.dtype == int
+    assert trans_xy == pytest.approx(np.array([[0, 0.5], [1, 1.5],
+                                               [1.5, 1.5], [2, 1.0]]))
+    assert trans_q.tolist() == [[1, 1], [1, 0], [0, -1], [-1, -1]]
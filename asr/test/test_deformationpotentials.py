@@ -1,2 +1,25 @@
+import numpy as np
+import pytest
+from asr.deformationpotentials import get_band_edges
+
+
 def test_defpots():
     pass
+
+
+@pytest.mark.ci
+def test_get_band_edges():
+    all_eigs = np.array([[-2.0, -1.0, 0.5, 3.0],
+                         [-1.5, 0.2, -0.8, 1.0],
+                         [-3.0, 2.0, 1.5, -0.1]])
+    edges = get_band_edges(all_eigs, efermi=0.1)
+    assert edges.tolist() == [[-1.0, 0.5], [-0.8, 0.2], [-0.1, 1.5]]
+
+
+@pytest.mark.ci
+@pytest.mark.parametrize('efermi', [-5.0, 5.0])
+def test_get_band_edges_no_states(efermi):
+    all_eigs = np.array([[-2.0, -1.0, 0.5, 3.0],
+                         [-1.5, 0.2, -0.8, 1.0]])
+    with pytest.raises(ValueError):
+        get_band_edges(all_eigs, efermi)
@@ -26,6 +26,14 @@ class Row:
         return self.result
 
 
+@pytest.mark.ci
+@pytest.mark.parametrize('nspins', [1, 2])
+def test_dos_plot(tmp_path, nspins):
+    calc = DOSCalculator()
+    calc.nspins = nspins
+    dos_plot(Row(_main(calc)), tmp_path / 'dos.png')
+
+
 @pytest.mark.integration_test
 @pytest.mark.integration_test_gpaw
 def test_gpaw_dos_h(tmp_path):